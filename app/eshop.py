@@ -1,15 +1,24 @@
 """E-commerce module containing shopping cart and order functionality."""
 
+import logging
 import uuid
+from itertools import islice
 from typing import Dict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 try:
     from services import ShippingService
+    from services.config import SHIPPING_LOG_SAMPLE_RATE
 except ImportError:
     ShippingService = None  # Fallback for missing service
+    SHIPPING_LOG_SAMPLE_RATE = None
+
+logger = logging.getLogger(__name__)
+
+# Orders read and placed together by place_orders.
+ORDER_CHUNK_SIZE = 100
 
 class Product:
     """Represents a product in the e-commerce system."""
@@ -103,17 +112,86 @@ class Order:
     """Represents a customer order with cart and shipping."""
     cart: ShoppingCart
     shipping_service: 'ShippingService'
-    order_id: str = str(uuid.uuid4())
+    order_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    shipping_id: Optional[str] = field(default=None, init=False)
 
     def place_order(self, shipping_type: str, due_date: datetime = None) -> str:
-        """Place order and create shipping request."""
+        """Place order and create shipping request.
+
+        Placing an order again returns the shipping id of the first placement.
+        """
+        if self.shipping_id is not None:
+            return self.shipping_id
         if not due_date:
             due_date = datetime.now(timezone.utc) + timedelta(seconds=3)
         product_ids = self.cart.submit_cart_order()
-        print(due_date)
-        return self.shipping_service.create_shipping(
+        logger.debug("Placing order %s", self.order_id,
+                     extra={"order_id": self.order_id, "shipping_type": shipping_type, "due_date": due_date,
+                            "sample_rate": SHIPPING_LOG_SAMPLE_RATE})
+        self.shipping_id = self.shipping_service.create_shipping(
             shipping_type, product_ids, self.order_id, due_date
         )
+        return self.shipping_id
+
+
+@dataclass
+class OrderResult:
+    """Outcome of one order placed through place_orders."""
+    order: Order
+    shipping_id: Optional[str] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def place_orders(orders: Iterable[Tuple[ShoppingCart, str, Optional[datetime]]],
+                 shipping_service: 'ShippingService',
+                 chunk_size: int = ORDER_CHUNK_SIZE) -> Iterator[OrderResult]:
+    """Place many orders, yielding one result per order in input order.
+
+    Orders are read ``chunk_size`` at a time and the next chunk is only read
+    once the results of the previous one have been consumed, so memory stays
+    bounded however many orders there are. Carts of invalid orders are not
+    submitted.
+    """
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be >= 1")
+    available = set(shipping_service.list_available_shipping_type())
+    orders = iter(orders)
+    while True:
+        chunk = list(islice(orders, chunk_size))
+        if not chunk:
+            return
+        yield from _place_chunk(chunk, shipping_service, available)
+
+
+def _place_chunk(chunk, shipping_service, available) -> List[OrderResult]:
+    results = []
+    placed = []
+    requests = []
+    now = datetime.now(timezone.utc)
+    for cart, shipping_type, due_date in chunk:
+        result = OrderResult(Order(cart, shipping_service))
+        results.append(result)
+        if not due_date:
+            due_date = now + timedelta(seconds=3)
+        if shipping_type not in available:
+            result.error = ValueError("Shipping type is not available")
+        elif due_date <= now:
+            result.error = ValueError("Shipping due datetime must be greater than datetime now")
+        else:
+            requests.append((shipping_type, cart.submit_cart_order(), result.order.order_id, due_date))
+            placed.append(result)
+
+    if requests:
+        for result, outcome in zip(placed, shipping_service.create_shippings(requests)):
+            if isinstance(outcome, Exception):
+                result.error = outcome
+            else:
+                result.shipping_id = result.order.shipping_id = outcome
+    return results
 
 
 @dataclass
@@ -125,3 +203,22 @@ class Shipment:
     def check_shipping_status(self) -> str:
         """Check current status of shipment."""
         return self.shipping_service.check_status(self.shipping_id)
+
+    @staticmethod
+    def check_many(shipping_ids: Iterable[str], shipping_service: 'ShippingService') -> Dict[str, str]:
+        """Check statuses of many shipments with batched reads.
+
+        Shipments that do not exist are left out of the result.
+        """
+        return shipping_service.check_statuses(list(shipping_ids))
+
+    @staticmethod
+    def wait_for_status(shipping_ids: Iterable[str], target, shipping_service: 'ShippingService',
+                        timeout: float = 30) -> Dict[str, Optional[str]]:
+        """Wait until every shipment reaches ``target`` (a status or a
+        collection of statuses) or ``timeout`` seconds pass.
+
+        All callers share one batched poll. Returns the last seen status of
+        each shipment, so callers can tell which ones did not get there.
+        """
+        return shipping_service.wait_for_status(list(shipping_ids), target, timeout)
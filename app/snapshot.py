@@ -0,0 +1,194 @@
+"""Compact snapshots of shopping carts for sharing sessions between instances.
+
+A snapshot is ``SNAPSHOT_MAGIC`` followed by::
+
+    version (1 byte) | flags (1 byte) | payload
+
+The payload is a varint line count followed by, per line, the varint length
+of the UTF-8 product name, the name and the varint quantity. It is
+zlib-compressed when that makes it smaller (FLAG_ZLIB). Products are stored
+by name and looked up in a catalog on restore.
+"""
+
+import sqlite3
+import threading
+import zlib
+from typing import Dict, Iterable, Mapping
+
+from app.eshop import Product, ShoppingCart
+from services.config import CART_SNAPSHOT_TABLE_NAME, SHIPPING_TABLE_RATE_LIMIT
+from services.db import get_dynamodb_resource
+from services.packing import decode_varint, encode_varint
+from services.repository import BATCH_GET_LIMIT, BATCH_WRITE_LIMIT, batch_requests
+from services.resilience import get_resilience
+
+SNAPSHOT_MAGIC = b"CS"
+SNAPSHOT_VERSION = 1
+FLAG_ZLIB = 0x01
+# Smaller payloads rarely shrink enough to pay for decompressing them.
+COMPRESS_MIN_BYTES = 64
+# SQLite allows 999 bound parameters per statement in older builds.
+SQLITE_BATCH_LIMIT = 500
+
+
+def _read_varint(data: bytes, offset: int):
+    if offset < len(data) and data[offset] < 0x80:
+        return data[offset], offset + 1
+    return decode_varint(data, offset)
+
+
+def snapshot_cart(cart: ShoppingCart, compress: bool = True) -> bytes:
+    """Encode cart contents as product names and quantities."""
+    payload = bytearray(encode_varint(len(cart.products)))
+    for product, amount in cart.products.items():
+        name = product.name.encode()
+        # Names and quantities nearly always fit a single varint byte.
+        payload += bytes((len(name),)) if len(name) < 0x80 else encode_varint(len(name))
+        payload += name
+        payload += bytes((amount,)) if amount < 0x80 else encode_varint(amount)
+    payload = bytes(payload)
+
+    flags = 0
+    if compress and len(payload) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(payload)
+        if len(compressed) < len(payload):
+            flags |= FLAG_ZLIB
+            payload = compressed
+    return SNAPSHOT_MAGIC + bytes((SNAPSHOT_VERSION, flags)) + payload
+
+
+def restore_cart(data: bytes, catalog: Mapping[str, Product]) -> ShoppingCart:
+    """Rebuild a cart from a snapshot, resolving products by name.
+
+    Raises:
+        ValueError: If the snapshot is malformed, names an unknown product or
+            asks for more than is available now
+    """
+    header = len(SNAPSHOT_MAGIC) + 2
+    if len(data) < header or not data.startswith(SNAPSHOT_MAGIC):
+        raise ValueError("Not a cart snapshot")
+    version, flags = data[len(SNAPSHOT_MAGIC)], data[len(SNAPSHOT_MAGIC) + 1]
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported cart snapshot version {version}")
+    payload = data[header:]
+    if flags & FLAG_ZLIB:
+        try:
+            payload = zlib.decompress(payload)
+        except zlib.error as error:
+            raise ValueError(f"Corrupt cart snapshot: {error}") from error
+
+    cart = ShoppingCart()
+    count, offset = decode_varint(payload, 0)
+    for _ in range(count):
+        length, offset = _read_varint(payload, offset)
+        name = payload[offset:offset + length].decode()
+        amount, offset = _read_varint(payload, offset + length)
+        if name not in catalog:
+            raise ValueError(f"Product {name} is not in the catalog")
+        cart.add_product(catalog[name], amount)
+    if offset != len(payload):
+        raise ValueError("Cart snapshot has trailing data")
+    return cart
+
+
+class SqliteCartStore:
+    """Cart snapshots in a local SQLite file, keyed by session id."""
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS cart_snapshots (session_id TEXT PRIMARY KEY, snapshot BLOB NOT NULL)"
+            )
+
+    def save_many(self, snapshots: Mapping[str, bytes]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO cart_snapshots (session_id, snapshot) VALUES (?, ?)",
+                snapshots.items()
+            )
+
+    def load_many(self, session_ids: Iterable[str]) -> Dict[str, bytes]:
+        session_ids = list(dict.fromkeys(session_ids))
+        snapshots = {}
+        with self._lock:
+            for start in range(0, len(session_ids), SQLITE_BATCH_LIMIT):
+                chunk = session_ids[start:start + SQLITE_BATCH_LIMIT]
+                rows = self._connection.execute(
+                    f"SELECT session_id, snapshot FROM cart_snapshots WHERE session_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                snapshots.update((session_id, bytes(snapshot)) for session_id, snapshot in rows)
+        return snapshots
+
+    def delete_many(self, session_ids: Iterable[str]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "DELETE FROM cart_snapshots WHERE session_id = ?",
+                ((session_id,) for session_id in session_ids)
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class DynamoCartStore:
+    """Cart snapshots in a DynamoDB table with a ``session_id`` hash key and
+    a binary ``snapshot`` attribute, read and written in batches."""
+
+    def __init__(self, table_name: str = CART_SNAPSHOT_TABLE_NAME):
+        self.table_name = table_name
+        self._resource = None
+        self.resilience = get_resilience(table_name, SHIPPING_TABLE_RATE_LIMIT)
+
+    @property
+    def resource(self):
+        if self._resource is None:
+            self._resource = get_dynamodb_resource()
+        return self._resource
+
+    def save_many(self, snapshots: Mapping[str, bytes]) -> None:
+        entries = [
+            {"PutRequest": {"Item": {"session_id": session_id, "snapshot": snapshot}}}
+            for session_id, snapshot in snapshots.items()
+        ]
+        self._write(entries)
+
+    def load_many(self, session_ids: Iterable[str]) -> Dict[str, bytes]:
+        session_ids = list(dict.fromkeys(session_ids))
+        snapshots = {}
+        for start in range(0, len(session_ids), BATCH_GET_LIMIT):
+            keys = [{"session_id": session_id} for session_id in session_ids[start:start + BATCH_GET_LIMIT]]
+            request = {self.table_name: {"Keys": keys}}
+            for response in batch_requests(self.resilience, self.resource.batch_get_item, request, "UnprocessedKeys"):
+                for item in response.get("Responses", {}).get(self.table_name, []):
+                    # The resource wraps binary attributes in boto3's Binary.
+                    snapshot = item["snapshot"]
+                    snapshots[item["session_id"]] = bytes(getattr(snapshot, "value", snapshot))
+        return snapshots
+
+    def delete_many(self, session_ids: Iterable[str]) -> None:
+        self._write([
+            {"DeleteRequest": {"Key": {"session_id": session_id}}} for session_id in dict.fromkeys(session_ids)
+        ])
+
+    def _write(self, entries):
+        for start in range(0, len(entries), BATCH_WRITE_LIMIT):
+            request = {self.table_name: entries[start:start + BATCH_WRITE_LIMIT]}
+            for _ in batch_requests(self.resilience, self.resource.batch_write_item, request, "UnprocessedItems"):
+                pass
+
+
+def save_carts(store, carts: Mapping[str, ShoppingCart]) -> None:
+    """Snapshot carts by session id and write them in one batch."""
+    store.save_many({session_id: snapshot_cart(cart) for session_id, cart in carts.items()})
+
+
+def load_carts(store, session_ids: Iterable[str], catalog: Mapping[str, Product]) -> Dict[str, ShoppingCart]:
+    """Read and restore carts in one batch. Sessions without a snapshot are
+    left out."""
+    return {
+        session_id: restore_cart(snapshot, catalog)
+        for session_id, snapshot in store.load_many(session_ids).items()
+    }
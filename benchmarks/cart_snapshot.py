@@ -0,0 +1,59 @@
+"""Compare cart snapshot size and encode/decode time against JSON and pickle.
+
+Usage: python benchmarks/cart_snapshot.py [--lines 20] [--repeat 2000]
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.eshop import Product, ShoppingCart  # noqa: E402
+from app.snapshot import restore_cart, snapshot_cart  # noqa: E402
+
+
+def build(lines: int):
+    catalog = {}
+    cart = ShoppingCart()
+    for index in range(lines):
+        product = Product(name=f"Product {index:05d}", price=9.99 + index, available_amount=1000)
+        catalog[product.name] = product
+        cart.add_product(product, index % 7 + 1)
+    return catalog, cart
+
+
+def formats(catalog):
+    def json_restore(data):
+        cart = ShoppingCart()
+        for name, amount in json.loads(data):
+            cart.add_product(catalog[name], amount)
+        return cart
+
+    return {
+        "snapshot": (snapshot_cart, lambda data: restore_cart(data, catalog)),
+        "snapshot (no zlib)": (lambda cart: snapshot_cart(cart, compress=False), lambda data: restore_cart(data, catalog)),
+        "json": (lambda cart: json.dumps([[p.name, n] for p, n in cart.products.items()]).encode(), json_restore),
+        "pickle": (lambda cart: pickle.dumps(cart, pickle.HIGHEST_PROTOCOL), pickle.loads),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    catalog, cart = build(args.lines)
+    print(f"{'format':<20}{'bytes':>8}{'encode us':>12}{'decode us':>12}")
+    for name, (encode, decode) in formats(catalog).items():
+        data = encode(cart)
+        encode_us = timeit.timeit(lambda: encode(cart), number=args.repeat) / args.repeat * 1e6
+        decode_us = timeit.timeit(lambda: decode(data), number=args.repeat) / args.repeat * 1e6
+        print(f"{name:<20}{len(data):>8}{encode_us:>12.1f}{decode_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Export terminal shipments from the shipping table to compressed JSONL chunks.
+
+Usage: python -m services.archive OUTPUT_DIR [--segments 4] [--chunk-size 10000] [--delete]
+
+Every scan segment writes its own ``segment-SSS-CCCCC.jsonl.gz`` chunks.
+``manifest.json`` lists the finished chunks with their item count and SHA-256
+and doubles as the checkpoint: running again with the same output directory
+resumes each segment after its last finished chunk. With ``--delete`` it first
+deletes the shipments of chunks whose delete was interrupted.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from .config import SHIPPING_ARCHIVE_CHUNK_SIZE, SHIPPING_ARCHIVE_SEGMENTS, SHIPPING_TABLE_NAME
+from .logs import configure_logging, stop_logging
+from .repository import ShippingRepository
+from .service import ShippingService
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+TERMINAL_STATUSES = (ShippingService.SHIPPING_COMPLETED, ShippingService.SHIPPING_FAILED)
+
+
+class ArchiveVerificationError(RuntimeError):
+    pass
+
+
+def _json_default(value):
+    # The DynamoDB resource returns numbers as Decimal and sets as set.
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_chunk(path: str):
+    with gzip.open(path, "rt", encoding="utf-8") as chunk:
+        for line in chunk:
+            yield json.loads(line)
+
+
+class ShippingArchiver:
+    def __init__(self, repository, output_dir: str, segments: int = SHIPPING_ARCHIVE_SEGMENTS,
+                 chunk_size: int = SHIPPING_ARCHIVE_CHUNK_SIZE, delete: bool = False,
+                 statuses=TERMINAL_STATUSES):
+        if segments < 1 or chunk_size < 1:
+            raise ValueError("Segments and chunk size must be >= 1")
+        self.repository = repository
+        self.output_dir = output_dir
+        self.segments = segments
+        self.chunk_size = chunk_size
+        self.delete = delete
+        self.statuses = list(statuses)
+        self._lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.output_dir, MANIFEST_NAME)
+
+    def _load_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {
+                "version": MANIFEST_VERSION,
+                "table": SHIPPING_TABLE_NAME,
+                "statuses": self.statuses,
+                "total_segments": self.segments,
+                "segments": {str(segment): {"start_key": None, "chunks": 0, "done": False}
+                             for segment in range(self.segments)},
+                "chunks": [],
+            }
+
+        with open(self.manifest_path, encoding="utf-8") as source:
+            manifest = json.load(source)
+        if manifest["total_segments"] != self.segments or manifest["statuses"] != self.statuses:
+            raise ValueError(
+                f"{self.manifest_path} was written with {manifest['total_segments']} segments "
+                f"for statuses {manifest['statuses']}"
+            )
+        return manifest
+
+    def _save_manifest(self):
+        temporary = self.manifest_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as target:
+            json.dump(self.manifest, target, indent=2, default=_json_default)
+        os.replace(temporary, self.manifest_path)
+
+    def run(self) -> dict:
+        if self.delete:
+            self._resume_deletes()
+        with ThreadPoolExecutor(max_workers=self.segments, thread_name_prefix="shipping-archive") as pool:
+            list(pool.map(self._archive_segment, range(self.segments)))
+        return self.stats()
+
+    def stats(self) -> dict:
+        with self._lock:
+            chunks = self.manifest["chunks"]
+            return {
+                "chunks": len(chunks),
+                "items": sum(chunk["items"] for chunk in chunks),
+                "deleted": sum(chunk["items"] for chunk in chunks if chunk["deleted"]),
+                "complete": all(state["done"] for state in self.manifest["segments"].values())
+                and (not self.delete or all(chunk["deleted"] for chunk in chunks)),
+            }
+
+    def _resume_deletes(self):
+        """Delete the shipments of recorded chunks whose delete did not finish,
+        taking the ids from the verified chunk file."""
+        for entry in [chunk for chunk in self.manifest["chunks"] if not chunk["deleted"]]:
+            path = os.path.join(self.output_dir, entry["file"])
+            if _sha256(path) != entry["sha256"]:
+                raise ArchiveVerificationError(f"{path} does not match its manifest checksum")
+            self._delete_chunk(entry, [item["shipping_id"] for item in read_chunk(path)])
+            logger.info("Deleted %d shipments archived in %s", entry["items"], path)
+
+    def _archive_segment(self, segment: int):
+        state = self.manifest["segments"][str(segment)]
+        if state["done"]:
+            return
+
+        writer = path = None
+        shipping_ids = []
+        pages = self.repository.scan_shippings(segment, self.segments, self.statuses, state["start_key"])
+        try:
+            for items, next_key in pages:
+                if items and writer is None:
+                    path = os.path.join(self.output_dir, f"segment-{segment:03d}-{state['chunks']:05d}.jsonl.gz")
+                    writer = gzip.open(path, "wt", encoding="utf-8")
+                for item in items:
+                    writer.write(json.dumps(item, default=_json_default, ensure_ascii=False) + "\n")
+                    shipping_ids.append(item["shipping_id"])
+
+                # Chunks end on page boundaries so the page's key resumes right after them.
+                if writer is not None and (len(shipping_ids) >= self.chunk_size or next_key is None):
+                    writer.close()
+                    writer = None
+                    self._finish_chunk(segment, path, shipping_ids, next_key)
+                    shipping_ids = []
+                elif next_key is None:
+                    with self._lock:
+                        state["done"] = True
+                        self._save_manifest()
+        finally:
+            # An unfinished chunk is rewritten from the checkpoint on resume.
+            if writer is not None:
+                writer.close()
+
+    def _finish_chunk(self, segment: int, path: str, shipping_ids: list, next_key):
+        written = [item["shipping_id"] for item in read_chunk(path)]
+        if written != shipping_ids:
+            raise ArchiveVerificationError(f"{path} does not contain the {len(shipping_ids)} scanned shipments")
+
+        entry = {
+            "file": os.path.basename(path),
+            "segment": segment,
+            "items": len(shipping_ids),
+            "sha256": _sha256(path),
+            "deleted": False,
+        }
+        # The chunk is recorded before deleting, so a crash in between leaves
+        # the items in the table rather than losing them.
+        with self._lock:
+            state = self.manifest["segments"][str(segment)]
+            state["chunks"] += 1
+            state["start_key"] = next_key
+            state["done"] = next_key is None
+            self.manifest["chunks"].append(entry)
+            self._save_manifest()
+
+        if self.delete:
+            self._delete_chunk(entry, shipping_ids)
+        logger.info("Archived %d shipments to %s", len(shipping_ids), path)
+
+    def _delete_chunk(self, entry: dict, shipping_ids: list):
+        self.repository.delete_shippings(shipping_ids)
+        with self._lock:
+            entry["deleted"] = True
+            self._save_manifest()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output_dir")
+    parser.add_argument("--segments", type=int, default=SHIPPING_ARCHIVE_SEGMENTS)
+    parser.add_argument("--chunk-size", type=int, default=SHIPPING_ARCHIVE_CHUNK_SIZE)
+    parser.add_argument("--delete", action="store_true", help="delete archived shipments after verifying each chunk")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    try:
+        archiver = ShippingArchiver(ShippingRepository(), args.output_dir, args.segments, args.chunk_size, args.delete)
+        stats = archiver.run()
+    finally:
+        stop_logging()
+    print(f"Archived {stats['items']} shipments in {stats['chunks']} chunks, deleted {stats['deleted']}")
+
+
+if __name__ == "__main__":
+    main()
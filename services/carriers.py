@@ -0,0 +1,49 @@
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from .config import SHIPPING_QUEUE, SHIPPING_QUEUE_SHARDING
+
+
+@dataclass(frozen=True)
+class Carrier:
+    name: str
+    slug: str
+    concurrency: int = 1
+    queue_name: Optional[str] = None
+
+
+class CarrierRegistry:
+    """Available shipping types with constant-time lookup and, when queues are
+    sharded, the queue each carrier's shipments are routed to."""
+
+    def __init__(self, carriers: Iterable[Carrier]):
+        self._carriers = {carrier.name: carrier for carrier in carriers}
+        self.names = tuple(self._carriers)
+
+    def __contains__(self, name) -> bool:
+        return name in self._carriers
+
+    def __getitem__(self, name) -> Carrier:
+        return self._carriers[name]
+
+    def __iter__(self):
+        return iter(self._carriers.values())
+
+    def __len__(self):
+        return len(self._carriers)
+
+
+def build_registry(sharded: bool = SHIPPING_QUEUE_SHARDING) -> CarrierRegistry:
+    carriers = (
+        ('Нова Пошта', 'nova-poshta', 4),
+        ('Укр Пошта', 'ukr-poshta', 2),
+        ('Meest Express', 'meest-express', 2),
+        ('Самовивіз', 'pickup', 1),
+    )
+    return CarrierRegistry(
+        Carrier(name, slug, concurrency, f"{SHIPPING_QUEUE}-{slug}" if sharded else None)
+        for name, slug, concurrency in carriers
+    )
+
+
+CARRIERS = build_registry()
@@ -4,3 +4,60 @@ AWS_ENDPOINT_URL = os.getenv("AWS_ENDPOINT_URL", "http://localhost:4566")
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 SHIPPING_TABLE_NAME = os.getenv("SHIPPING_TABLE_NAME", "ShippingTable")
 SHIPPING_QUEUE = os.getenv("SHIPPING_QUEUE_NAME", "ShippingQueue")
+
+SHIPPING_PROFILE_MODE = os.getenv("SHIPPING_PROFILE_MODE", "")
+SHIPPING_PROFILE_DIR = os.getenv("SHIPPING_PROFILE_DIR", "profiles")
+SHIPPING_PROFILE_EVERY = int(os.getenv("SHIPPING_PROFILE_EVERY", "0"))
+SHIPPING_PROFILE_KEEP = int(os.getenv("SHIPPING_PROFILE_KEEP", "20"))
+SHIPPING_PROFILE_OVERHEAD = float(os.getenv("SHIPPING_PROFILE_OVERHEAD", "0.05"))
+
+# Requests per second; 0 disables client-side rate limiting.
+SHIPPING_TABLE_RATE_LIMIT = float(os.getenv("SHIPPING_TABLE_RATE_LIMIT", "200"))
+SHIPPING_QUEUE_RATE_LIMIT = float(os.getenv("SHIPPING_QUEUE_RATE_LIMIT", "300"))
+
+SHIPPING_CONSUMER_MAX_BATCH = int(os.getenv("SHIPPING_CONSUMER_MAX_BATCH", "10"))
+SHIPPING_CONSUMER_MIN_WAIT = int(os.getenv("SHIPPING_CONSUMER_MIN_WAIT", "0"))
+SHIPPING_CONSUMER_MAX_WAIT = int(os.getenv("SHIPPING_CONSUMER_MAX_WAIT", "20"))
+SHIPPING_CONSUMER_MAX_RECEIVERS = int(os.getenv("SHIPPING_CONSUMER_MAX_RECEIVERS", "4"))
+
+SHIPPING_DLQ = os.getenv("SHIPPING_DLQ_NAME", "ShippingDeadLetterQueue")
+SHIPPING_MAX_RECEIVES = int(os.getenv("SHIPPING_MAX_RECEIVES", "5"))
+SHIPPING_VISIBILITY_TIMEOUT = int(os.getenv("SHIPPING_VISIBILITY_TIMEOUT", "30"))
+
+SHIPPING_IDEMPOTENCY_CACHE_SIZE = int(os.getenv("SHIPPING_IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+SHIPPING_DEDUP_WINDOW = int(os.getenv("SHIPPING_DEDUP_WINDOW", "3600"))
+SHIPPING_DEDUP_CAPACITY = int(os.getenv("SHIPPING_DEDUP_CAPACITY", "100000"))
+SHIPPING_DEDUP_ERROR_RATE = float(os.getenv("SHIPPING_DEDUP_ERROR_RATE", "1e-9"))
+# Optional DynamoDB table shared by all workers; empty keeps dedup per process.
+SHIPPING_DEDUP_TABLE_NAME = os.getenv("SHIPPING_DEDUP_TABLE_NAME", "")
+
+# When enabled every carrier gets its own "<SHIPPING_QUEUE>-<slug>" queue.
+SHIPPING_QUEUE_SHARDING = os.getenv("SHIPPING_QUEUE_SHARDING", "0") == "1"
+
+SHIPPING_SCHEDULER_CAPACITY = int(os.getenv("SHIPPING_SCHEDULER_CAPACITY", "100"))
+SHIPPING_SCHEDULER_URGENT_WINDOW = int(os.getenv("SHIPPING_SCHEDULER_URGENT_WINDOW", "300"))
+SHIPPING_SCHEDULER_URGENT_WEIGHT = int(os.getenv("SHIPPING_SCHEDULER_URGENT_WEIGHT", "3"))
+SHIPPING_SCHEDULER_NORMAL_WEIGHT = int(os.getenv("SHIPPING_SCHEDULER_NORMAL_WEIGHT", "1"))
+# Seconds a message may wait in the scheduler before the whole buffer is released.
+SHIPPING_SCHEDULER_MAX_AGE = int(os.getenv("SHIPPING_SCHEDULER_MAX_AGE", "60"))
+
+# Pack many shipping ids into one SQS message for multi-id sends.
+SHIPPING_PACK_MESSAGES = os.getenv("SHIPPING_PACK_MESSAGES", "0") == "1"
+
+# Bounds of the adaptive interval between shared status polls, in seconds.
+SHIPPING_STATUS_POLL_MIN = float(os.getenv("SHIPPING_STATUS_POLL_MIN", "0.1"))
+SHIPPING_STATUS_POLL_MAX = float(os.getenv("SHIPPING_STATUS_POLL_MAX", "5"))
+
+SHIPPING_ARCHIVE_SEGMENTS = int(os.getenv("SHIPPING_ARCHIVE_SEGMENTS", "4"))
+SHIPPING_ARCHIVE_CHUNK_SIZE = int(os.getenv("SHIPPING_ARCHIVE_CHUNK_SIZE", "10000"))
+
+CART_SNAPSHOT_TABLE_NAME = os.getenv("CART_SNAPSHOT_TABLE_NAME", "CartSnapshots")
+
+SHIPPING_LOG_LEVEL = os.getenv("SHIPPING_LOG_LEVEL", "INFO")
+# Per-logger overrides, e.g. "services.heartbeat=DEBUG,app.eshop=WARNING".
+SHIPPING_LOG_LEVELS = os.getenv("SHIPPING_LOG_LEVELS", "")
+SHIPPING_LOG_FORMAT = os.getenv("SHIPPING_LOG_FORMAT", "json")
+SHIPPING_LOG_QUEUE_SIZE = int(os.getenv("SHIPPING_LOG_QUEUE_SIZE", "10000"))
+# Fraction of per-shipment and per-order events that are logged.
+SHIPPING_LOG_SAMPLE_RATE = float(os.getenv("SHIPPING_LOG_SAMPLE_RATE", "0.01"))
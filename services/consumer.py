@@ -0,0 +1,155 @@
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from .config import (
+    SHIPPING_CONSUMER_MAX_BATCH,
+    SHIPPING_CONSUMER_MAX_RECEIVERS,
+    SHIPPING_CONSUMER_MAX_WAIT,
+    SHIPPING_CONSUMER_MIN_WAIT,
+)
+
+# SQS limits for a single ReceiveMessage call.
+SQS_MAX_BATCH = 10
+SQS_MAX_WAIT = 20
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+@dataclass(frozen=True)
+class ConsumerPlan:
+    batch_size: int
+    wait_time: int
+    receivers: int
+
+
+class AdaptiveConsumer:
+    """Long-poll consumer that sizes each round from the approximate queue depth.
+
+    An empty queue is polled by one receiver with the longest wait, so idle
+    workers make as few empty receives as possible. A backlog is drained with
+    full batches, short waits and up to ``max_receivers`` concurrent receives.
+    The next round is received while the current one is being processed.
+
+    Given ``carriers`` and sharded queues, each carrier's queue is consumed as an
+    independent lane whose receivers are also capped by the carrier's
+    concurrency limit.
+    """
+
+    def __init__(self, service, publisher=None, min_batch: int = 1, max_batch: int = SHIPPING_CONSUMER_MAX_BATCH,
+                 min_wait: int = SHIPPING_CONSUMER_MIN_WAIT, max_wait: int = SHIPPING_CONSUMER_MAX_WAIT,
+                 min_receivers: int = 1, max_receivers: int = SHIPPING_CONSUMER_MAX_RECEIVERS,
+                 carriers: Iterable[str] = None):
+        if not 1 <= min_batch <= max_batch <= SQS_MAX_BATCH:
+            raise ValueError(f"Batch bounds must satisfy 1 <= min <= max <= {SQS_MAX_BATCH}")
+        if not 0 <= min_wait <= max_wait <= SQS_MAX_WAIT:
+            raise ValueError(f"Wait bounds must satisfy 0 <= min <= max <= {SQS_MAX_WAIT}")
+        if not 1 <= min_receivers <= max_receivers:
+            raise ValueError("Receiver bounds must satisfy 1 <= min <= max")
+
+        self.service = service
+        self.publisher = publisher or service.publisher
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.min_receivers = min_receivers
+        self.max_receivers = max_receivers
+        self.carriers = list(carriers) if carriers is not None else None
+        self.rounds = 0
+        self.received = 0
+        self._counter_lock = threading.Lock()
+
+    def plan(self, depth: int, max_receivers: int = None) -> ConsumerPlan:
+        max_receivers = max(self.min_receivers, max_receivers or self.max_receivers)
+        if depth <= 0:
+            return ConsumerPlan(self.max_batch, self.max_wait, self.min_receivers)
+
+        batch_size = _clamp(depth, self.min_batch, self.max_batch)
+        receivers = _clamp(math.ceil(depth / self.max_batch), self.min_receivers, max_receivers)
+        # A partial batch waits a little for stragglers, a backlog does not wait.
+        wait_time = self.min_wait if depth >= self.max_batch else _clamp(
+            self.max_wait * (self.max_batch - depth) // self.max_batch, self.min_wait, self.max_wait
+        )
+        return ConsumerPlan(batch_size, wait_time, receivers)
+
+    def lanes(self) -> Dict[Optional[str], int]:
+        """Queue name (None for the shared queue) -> receiver limit."""
+        if self.carriers is None:
+            return {None: self.max_receivers}
+
+        lanes = {}
+        for name in self.carriers:
+            carrier = self.service.carriers[name]
+            limit = min(carrier.concurrency, self.max_receivers)
+            lanes[carrier.queue_name] = max(lanes.get(carrier.queue_name, 0), limit)
+        return lanes
+
+    def _receive(self, executor, plan: ConsumerPlan, queue_url: str = None):
+        kwargs = {"queue_url": queue_url} if queue_url else {}
+        futures = [
+            executor.submit(self.publisher.receive_shipping, plan.batch_size, plan.wait_time, **kwargs)
+            for _ in range(plan.receivers)
+        ]
+        for future in futures:
+            future.add_done_callback(self._track)
+        return futures
+
+    def _track(self, future):
+        # Prefetched messages wait for the current round, keep them invisible meanwhile.
+        if future.exception() is None:
+            self.service.heartbeat.track(future.result())
+
+    def _plan_lane(self, queue_url, max_receivers):
+        depth = self.publisher.approximate_depth(queue_url) if queue_url else self.publisher.approximate_depth()
+        return self.plan(depth, max_receivers)
+
+    def _run_lane(self, queue_name, max_receivers, stop, max_rounds) -> list:
+        queue_url = self.publisher.queue_url_for(queue_name) if queue_name else None
+        results = []
+        rounds = 0
+        with ThreadPoolExecutor(max_receivers, thread_name_prefix="shipping-receiver") as executor:
+            pending = self._receive(executor, self._plan_lane(queue_url, max_receivers), queue_url)
+            while pending:
+                messages = [message for future in pending for message in future.result()]
+                rounds += 1
+                with self._counter_lock:
+                    self.rounds += 1
+                    self.received += len(messages)
+
+                last_round = stop.is_set() or (max_rounds is not None and rounds >= max_rounds)
+                pending = [] if last_round else self._receive(
+                    executor, self._plan_lane(queue_url, max_receivers), queue_url
+                )
+                results.extend(self.service.process_messages(messages))
+
+        return results
+
+    def run(self, stop: threading.Event = None, max_rounds: int = None) -> list:
+        stop = stop or threading.Event()
+        try:
+            results = self._run_lanes(stop, max_rounds)
+        except BaseException:
+            self.service.flush_scheduled()
+            raise
+        # Messages the scheduler still holds would otherwise stay invisible.
+        results.extend(self.service.flush_scheduled())
+        return results
+
+    def _run_lanes(self, stop, max_rounds) -> list:
+        lanes = self.lanes()
+        if len(lanes) == 1:
+            (queue_name, max_receivers), = lanes.items()
+            return self._run_lane(queue_name, max_receivers, stop, max_rounds)
+
+        # Lanes run independently so an idle carrier's long poll never holds up a busy one.
+        with ThreadPoolExecutor(len(lanes), thread_name_prefix="shipping-lane") as executor:
+            futures = [
+                executor.submit(self._run_lane, queue_name, max_receivers, stop, max_rounds)
+                for queue_name, max_receivers in lanes.items()
+            ]
+            return [result for future in futures for result in future.result()]
@@ -1,9 +1,41 @@
-import boto3
+import threading
+
 from .config import AWS_ENDPOINT_URL, AWS_REGION
 
+# boto3 costs hundreds of milliseconds to import, so it is only loaded when the
+# first client is created. Client creation through the default session is not
+# thread-safe, hence the lock.
+_client_lock = threading.Lock()
+
+
+def _client_config():
+    from botocore.config import Config
+
+    # Retries are owned by services.resilience, so botocore makes one attempt.
+    return Config(retries={"total_max_attempts": 1, "mode": "standard"})
+
+
 def get_dynamodb_resource():
-    return boto3.resource(
-        "dynamodb",
-        endpoint_url=AWS_ENDPOINT_URL,
-        region_name=AWS_REGION
-    )
+    with _client_lock:
+        import boto3
+
+        return boto3.resource(
+            "dynamodb",
+            endpoint_url=AWS_ENDPOINT_URL,
+            region_name=AWS_REGION,
+            config=_client_config(),
+        )
+
+
+def get_sqs_client():
+    with _client_lock:
+        import boto3
+
+        return boto3.client(
+            "sqs",
+            endpoint_url=AWS_ENDPOINT_URL,
+            region_name=AWS_REGION,
+            aws_access_key_id="test",
+            aws_secret_access_key="test",
+            config=_client_config(),
+        )
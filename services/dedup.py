@@ -0,0 +1,133 @@
+import hashlib
+import math
+import threading
+import time
+
+from .config import (
+    SHIPPING_DEDUP_CAPACITY,
+    SHIPPING_DEDUP_ERROR_RATE,
+    SHIPPING_DEDUP_TABLE_NAME,
+    SHIPPING_DEDUP_WINDOW,
+    SHIPPING_TABLE_RATE_LIMIT,
+)
+from .db import get_dynamodb_resource
+from .resilience import error_code, get_resilience
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("Capacity must be >= 1 and error rate between 0 and 1")
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RotatingBloomFilter:
+    """Remembers keys for between one and two windows using two generations.
+
+    The current generation is retired every ``window`` seconds, or as soon as it
+    holds ``capacity`` keys so the false-positive rate stays within bounds.
+    """
+
+    def __init__(self, window: float = SHIPPING_DEDUP_WINDOW, capacity: int = SHIPPING_DEDUP_CAPACITY,
+                 error_rate: float = SHIPPING_DEDUP_ERROR_RATE, clock=time.monotonic):
+        self.window = window
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._clock = clock
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous = None
+        self._rotated_at = clock()
+        self._lock = threading.Lock()
+
+    def _rotate_if_due(self):
+        if self._clock() - self._rotated_at >= self.window or self._current.count >= self.capacity:
+            self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.error_rate)
+            self._rotated_at = self._clock()
+
+    def add(self, key: str):
+        with self._lock:
+            self._rotate_if_due()
+            self._current.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._rotate_if_due()
+            return key in self._current or (self._previous is not None and key in self._previous)
+
+
+class DynamoDedupStore:
+    """Processed shipping ids shared between workers, expired by DynamoDB TTL
+    on the ``expires_at`` attribute."""
+
+    def __init__(self, table_name: str = SHIPPING_DEDUP_TABLE_NAME, ttl: int = SHIPPING_DEDUP_WINDOW):
+        self.table_name = table_name
+        self.ttl = ttl
+        self._table = None
+        self.resilience = get_resilience(table_name, SHIPPING_TABLE_RATE_LIMIT)
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = get_dynamodb_resource().Table(self.table_name)
+        return self._table
+
+    def __contains__(self, shipping_id: str) -> bool:
+        response = self.resilience.call(self.table.get_item, Key={"shipping_id": shipping_id})
+        item = response.get("Item")
+        return item is not None and int(item["expires_at"]) > time.time()
+
+    def add(self, shipping_id: str):
+        try:
+            self.resilience.call(
+                self.table.put_item,
+                Item={"shipping_id": shipping_id, "expires_at": int(time.time()) + self.ttl},
+                ConditionExpression="attribute_not_exists(shipping_id)"
+            )
+        except Exception as error:
+            if error_code(error) != "ConditionalCheckFailedException":
+                raise
+
+
+class ShippingDeduplicator:
+    """Suppresses redelivered shipping ids that this worker (or, with a shared
+    store, any worker) already processed. The local filter is checked first so
+    most duplicates cost no I/O at all."""
+
+    def __init__(self, local=None, shared=None):
+        self.local = local if local is not None else RotatingBloomFilter()
+        self.shared = shared
+        self.suppressed = 0
+
+    @classmethod
+    def from_config(cls):
+        return cls(shared=DynamoDedupStore() if SHIPPING_DEDUP_TABLE_NAME else None)
+
+    def is_duplicate(self, shipping_id: str) -> bool:
+        duplicate = shipping_id in self.local or (self.shared is not None and shipping_id in self.shared)
+        if duplicate:
+            self.suppressed += 1
+        return duplicate
+
+    def mark(self, shipping_id: str):
+        self.local.add(shipping_id)
+        if self.shared is not None:
+            self.shared.add(shipping_id)
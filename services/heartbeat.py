@@ -0,0 +1,71 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+from .config import SHIPPING_VISIBILITY_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class VisibilityHeartbeat:
+    """Keeps in-flight SQS messages invisible while they are being processed.
+
+    A background thread extends the visibility timeout of every tracked message
+    each ``interval`` seconds, so slow items are not redelivered to another
+    worker while this one is still working on them.
+    """
+
+    def __init__(self, publisher, timeout: int = SHIPPING_VISIBILITY_TIMEOUT, interval: float = None):
+        self.publisher = publisher
+        self.timeout = timeout
+        self.interval = interval if interval is not None else timeout / 3
+        self.extensions = 0
+        # Keyed by handle and id: ids unpacked from one message share a handle.
+        self._tracked = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def track(self, messages):
+        with self._lock:
+            for message in messages:
+                self._tracked[(message.receipt_handle, message.shipping_id)] = message
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="shipping-heartbeat", daemon=True)
+                self._thread.start()
+
+    def release(self, messages):
+        with self._lock:
+            for message in messages:
+                self._tracked.pop((message.receipt_handle, message.shipping_id), None)
+
+    @contextmanager
+    def tracking(self, messages):
+        self.track(messages)
+        try:
+            yield
+        finally:
+            self.release(messages)
+
+    def beat(self):
+        with self._lock:
+            messages = list(self._tracked.values())
+        if not messages:
+            return
+        try:
+            self.publisher.extend_visibility(messages, self.timeout)
+            self.extensions += len(messages)
+        except Exception:
+            logger.exception("Failed to extend visibility of %d shipping messages", len(messages))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.beat()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
@@ -0,0 +1,34 @@
+import threading
+from collections import OrderedDict
+
+from .config import SHIPPING_IDEMPOTENCY_CACHE_SIZE
+
+
+class IdempotencyCache:
+    """In-process LRU of order id -> shipping id for orders already placed."""
+
+    def __init__(self, maxsize: int = SHIPPING_IDEMPOTENCY_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError("Cache size must be >= 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, order_id):
+        with self._lock:
+            shipping_id = self._entries.get(order_id)
+            if shipping_id is not None:
+                self._entries.move_to_end(order_id)
+                self.hits += 1
+            return shipping_id
+
+    def put(self, order_id, shipping_id):
+        with self._lock:
+            self._entries[order_id] = shipping_id
+            self._entries.move_to_end(order_id)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,154 @@
+"""Structured, non-blocking logging for the shop and the shipping services.
+
+Callers only put records on a bounded queue; a background listener thread
+formats and writes them. Messages are formatted in the listener, not in the
+calling thread. When the queue is full records are dropped and counted
+instead of blocking order placement or shipment processing.
+
+Fields passed through ``extra`` are written as structured fields. Records
+with a ``sample_rate`` field are kept with that probability, for events that
+would otherwise flood the log.
+"""
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from .config import (
+    SHIPPING_LOG_FORMAT,
+    SHIPPING_LOG_LEVEL,
+    SHIPPING_LOG_LEVELS,
+    SHIPPING_LOG_QUEUE_SIZE,
+)
+
+# Attributes every LogRecord has; anything else came in through ``extra``.
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def record_fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        entry.update(record_fields(record))
+        entry.pop("sample_rate", None)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = record_fields(record)
+        fields.pop("sample_rate", None)
+        line = super().format(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps records that carry a ``sample_rate`` with that probability."""
+
+    def __init__(self, random_source=random.random):
+        super().__init__()
+        self.dropped = 0
+        self._random = random_source
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        if rate is None or self._random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hands records to the listener without formatting and never blocks."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener formats the record, so msg and args are left as they are.
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec: str) -> dict:
+    levels = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = entry.partition("=")
+        if not level:
+            raise ValueError(f"Expected <logger>=<LEVEL>, got {entry!r}")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_listener = None
+_handler = None
+_lock = threading.Lock()
+
+
+def configure_logging(level: str = SHIPPING_LOG_LEVEL, levels=SHIPPING_LOG_LEVELS, fmt: str = SHIPPING_LOG_FORMAT,
+                      stream=None, queue_size: int = SHIPPING_LOG_QUEUE_SIZE) -> DroppingQueueHandler:
+    """Route the root logger through a queue to a background writer.
+
+    ``levels`` maps logger names to levels, or is a "name=LEVEL,..." string.
+    Calling it again replaces the previous configuration.
+    """
+    global _listener, _handler
+    if isinstance(levels, str):
+        levels = parse_levels(levels)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    handler = DroppingQueueHandler(queue.Queue(queue_size))
+    handler.addFilter(SamplingFilter())
+    listener = QueueListener(handler.queue, output, respect_handler_level=True)
+
+    with _lock:
+        _stop()
+        root = logging.getLogger()
+        root.setLevel(level.upper())
+        root.addHandler(handler)
+        for name, logger_level in levels.items():
+            logging.getLogger(name).setLevel(logger_level)
+        listener.start()
+        _listener, _handler = listener, handler
+    return handler
+
+
+def _stop():
+    global _listener, _handler
+    if _listener is not None:
+        # Flushes whatever is still queued before the thread exits.
+        _listener.stop()
+        logging.getLogger().removeHandler(_handler)
+        _listener = _handler = None
+
+
+def stop_logging():
+    with _lock:
+        _stop()
@@ -0,0 +1,148 @@
+"""Packed SQS message bodies carrying many shipping ids.
+
+A packed body is ``PACK_PREFIX`` followed by base64 of::
+
+    version (1 byte) | flags (1 byte) | count (varint) | payload
+
+The payload holds 16-byte binary UUIDs, or length-prefixed UTF-8 strings when
+any id is not a canonical UUID (FLAG_TEXT). It is zlib-compressed when that
+makes it smaller (FLAG_ZLIB).
+"""
+import base64
+import uuid
+import zlib
+from typing import Iterable, List
+
+PACK_PREFIX = "SP:"
+PACK_VERSION = 1
+FLAG_ZLIB = 0x01
+FLAG_TEXT = 0x02
+# SQS limit for a message body and for the sum of bodies in one batch call.
+SQS_MAX_MESSAGE_BYTES = 262144
+# Leaves room for message attributes, which count towards the SQS limit.
+PACK_MAX_BYTES = SQS_MAX_MESSAGE_BYTES - 1024
+# Header allowance: prefix, version, flags and the count varint.
+HEADER_BYTES = len(PACK_PREFIX) + 2 + 10
+
+
+def encode_varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def decode_varint(data: bytes, offset: int):
+    value = shift = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("Truncated varint")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _as_uuid_bytes(shipping_id: str):
+    try:
+        parsed = uuid.UUID(shipping_id)
+    except (ValueError, AttributeError, TypeError):
+        return None
+    return parsed.bytes if str(parsed) == shipping_id else None
+
+
+def is_packed(body: str) -> bool:
+    return body.startswith(PACK_PREFIX)
+
+
+def encode(shipping_ids: List[str]) -> str:
+    binary = [_as_uuid_bytes(shipping_id) for shipping_id in shipping_ids]
+    flags = 0
+    if all(value is not None for value in binary):
+        payload = b"".join(binary)
+    else:
+        flags |= FLAG_TEXT
+        parts = []
+        for shipping_id in shipping_ids:
+            raw = shipping_id.encode()
+            parts.append(encode_varint(len(raw)) + raw)
+        payload = b"".join(parts)
+
+    compressed = zlib.compress(payload)
+    if len(compressed) < len(payload):
+        flags |= FLAG_ZLIB
+        payload = compressed
+
+    header = bytes((PACK_VERSION, flags)) + encode_varint(len(shipping_ids))
+    return PACK_PREFIX + base64.b64encode(header + payload).decode("ascii")
+
+
+def decode(body: str) -> List[str]:
+    """Ids carried by a packed body.
+
+    Raises:
+        ValueError: If the body is not a packed message or is corrupt
+    """
+    if not is_packed(body):
+        raise ValueError("Body is not a packed shipping message")
+    data = base64.b64decode(body[len(PACK_PREFIX):])
+    if len(data) < 2 or data[0] != PACK_VERSION:
+        raise ValueError(f"Unsupported packed message version {data[0] if data else None}")
+    flags = data[1]
+    count, offset = decode_varint(data, 2)
+    payload = data[offset:]
+    if flags & FLAG_ZLIB:
+        try:
+            payload = zlib.decompress(payload)
+        except zlib.error as error:
+            raise ValueError(f"Corrupt packed payload: {error}") from error
+
+    if not flags & FLAG_TEXT:
+        if len(payload) != count * 16:
+            raise ValueError("Packed UUID payload has the wrong length")
+        return [str(uuid.UUID(bytes=payload[i:i + 16])) for i in range(0, len(payload), 16)]
+
+    shipping_ids = []
+    offset = 0
+    for _ in range(count):
+        length, offset = decode_varint(payload, offset)
+        shipping_ids.append(payload[offset:offset + length].decode())
+        offset += length
+    if offset != len(payload):
+        raise ValueError("Packed text payload has trailing data")
+    return shipping_ids
+
+
+def pack(shipping_ids: Iterable[str], max_bytes: int = PACK_MAX_BYTES) -> List[str]:
+    """Split ids into as few packed bodies as fit within ``max_bytes`` each."""
+    # base64 grows the payload by 4/3; size against the uncompressed payload.
+    budget = (max_bytes - HEADER_BYTES) * 3 // 4
+    bodies = []
+    chunk = []
+    binary_size = text_size = 0
+    has_text = False
+    for shipping_id in shipping_ids:
+        text = len(shipping_id.encode())
+        id_text_size = len(encode_varint(text)) + text
+        id_is_text = _as_uuid_bytes(shipping_id) is None
+        # One text id switches the whole chunk to the text encoding.
+        size = text_size + id_text_size if has_text or id_is_text else binary_size + 16
+        if chunk and size > budget:
+            bodies.append(encode(chunk))
+            chunk = []
+            binary_size = text_size = 0
+            has_text = False
+        chunk.append(shipping_id)
+        binary_size += 16
+        text_size += id_text_size
+        has_text = has_text or id_is_text
+    if chunk:
+        bodies.append(encode(chunk))
+    return bodies
@@ -0,0 +1,171 @@
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from .config import (
+    SHIPPING_PROFILE_DIR,
+    SHIPPING_PROFILE_EVERY,
+    SHIPPING_PROFILE_KEEP,
+    SHIPPING_PROFILE_MODE,
+    SHIPPING_PROFILE_OVERHEAD,
+)
+
+PROFILE_MODES = ("cprofile", "sample", "tracemalloc")
+FILE_PREFIX = "shipping-batch-"
+
+
+class BatchProfiler:
+    """Profiles every Nth shipping batch, or the next one after arm()/a signal.
+
+    Profiled batches are counted as pure overhead; once their share of the
+    profiler's lifetime exceeds ``overhead_budget`` further batches are skipped
+    until the share drops again.
+    """
+
+    def __init__(self, output_dir: str = SHIPPING_PROFILE_DIR, mode: str = "cprofile",
+                 every: int = SHIPPING_PROFILE_EVERY, keep: int = SHIPPING_PROFILE_KEEP,
+                 overhead_budget: float = SHIPPING_PROFILE_OVERHEAD, top: int = 15,
+                 sample_interval: float = 0.005):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Profile mode must be one of {', '.join(PROFILE_MODES)}")
+        if every < 0 or keep < 1:
+            raise ValueError("Profile interval must be >= 0 and keep must be >= 1")
+
+        self.output_dir = output_dir
+        self.mode = mode
+        self.every = every
+        self.keep = keep
+        self.overhead_budget = overhead_budget
+        self.top = top
+        self.sample_interval = sample_interval
+
+        self.batches = 0
+        self.profiled = 0
+        self.skipped = 0
+        self.profiled_seconds = 0.0
+        self._started = time.perf_counter()
+        self._armed = threading.Event()
+
+    @classmethod
+    def from_config(cls):
+        """Build a profiler from the SHIPPING_PROFILE_* settings, or return None
+        when SHIPPING_PROFILE_MODE is not set."""
+        if not SHIPPING_PROFILE_MODE:
+            return None
+        return cls(mode=SHIPPING_PROFILE_MODE)
+
+    def arm(self):
+        self._armed.set()
+
+    def install_signal_handler(self, signum=None):
+        if signum is None:
+            signum = signal.SIGUSR1
+        signal.signal(signum, lambda *_: self.arm())
+
+    def _should_profile(self) -> bool:
+        self.batches += 1
+        due = self._armed.is_set() or (self.every and self.batches % self.every == 0)
+        if not due:
+            return False
+
+        elapsed = time.perf_counter() - self._started
+        if self.profiled_seconds > self.overhead_budget * elapsed:
+            self.skipped += 1
+            return False
+
+        self._armed.clear()
+        return True
+
+    @contextmanager
+    def batch(self):
+        if not self._should_profile():
+            yield
+            return
+
+        profile = {"cprofile": self._cprofile, "sample": self._sample, "tracemalloc": self._tracemalloc}[self.mode]
+        start = time.perf_counter()
+        try:
+            with profile():
+                yield
+        finally:
+            self.profiled += 1
+            self.profiled_seconds += time.perf_counter() - start
+
+    def _output_path(self, extension: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = f"{FILE_PREFIX}{time.time_ns()}-{self.batches:06d}.{extension}"
+        return os.path.join(self.output_dir, name)
+
+    def _rotate(self):
+        # Names start with time_ns followed by the batch number, so they sort in
+        # write order even when several files share one mtime tick.
+        names = sorted(name for name in os.listdir(self.output_dir) if name.startswith(FILE_PREFIX))
+        for name in names[:-self.keep]:
+            os.remove(os.path.join(self.output_dir, name))
+
+    @contextmanager
+    def _cprofile(self):
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(self._output_path("prof"))
+            self._rotate()
+
+    @contextmanager
+    def _sample(self):
+        thread_id = threading.get_ident()
+        stacks = Counter()
+        stop = threading.Event()
+
+        def sampler():
+            while not stop.wait(self.sample_interval):
+                frame = sys._current_frames().get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    stacks[";".join(reversed(stack))] += 1
+
+        thread = threading.Thread(target=sampler, name="shipping-profiler", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+            with open(self._output_path("folded"), "w", encoding="utf-8") as output:
+                for stack, count in stacks.most_common():
+                    output.write(f"{stack} {count}\n")
+            self._rotate()
+
+    @contextmanager
+    def _tracemalloc(self):
+        import tracemalloc
+
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        try:
+            yield
+        finally:
+            after = tracemalloc.take_snapshot()
+            if started_here:
+                tracemalloc.stop()
+            ignored = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            stats = after.filter_traces(ignored).compare_to(before.filter_traces(ignored), "lineno")
+            with open(self._output_path("alloc.txt"), "w", encoding="utf-8") as output:
+                for stat in stats[:self.top]:
+                    output.write(f"{stat}\n")
+            self._rotate()
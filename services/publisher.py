@@ -1,37 +1,320 @@
-import boto3
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import List, Optional
 
-from .config import AWS_ENDPOINT_URL, AWS_REGION, SHIPPING_QUEUE
+from .config import SHIPPING_DLQ, SHIPPING_PACK_MESSAGES, SHIPPING_QUEUE, SHIPPING_QUEUE_RATE_LIMIT
+from .db import get_sqs_client
+from .packing import SQS_MAX_MESSAGE_BYTES, decode, is_packed, pack
+from .resilience import get_resilience
+
+logger = logging.getLogger(__name__)
+
+# SQS accepts at most 10 entries per batch call.
+SQS_BATCH_LIMIT = 10
+# Packed messages tracked at once; the oldest are forgotten beyond this and
+# are then redelivered rather than deleted.
+OPEN_PACKS_LIMIT = 10000
+
+
+@dataclass
+class ShippingMessage:
+    shipping_id: str
+    receipt_handle: str
+    queue_url: str
+    receive_count: int = 1
+    # Set on dead-lettered messages so a redrive returns them to their own queue.
+    source_queue_url: Optional[str] = None
+    # Number of shipping ids carried by the SQS message this one was unpacked from.
+    pack_size: int = 1
+
+
+def _chunks(items, size=SQS_BATCH_LIMIT):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _by_queue(messages):
+    groups = defaultdict(list)
+    for message in messages:
+        groups[message.queue_url].append(message)
+    return groups.items()
+
+
+def _attribute(value) -> dict:
+    return {'DataType': 'String', 'StringValue': str(value)}
 
 
 class ShippingPublisher:
-    def __init__(self):
-        self.client = boto3.client(
-            "sqs",
-            endpoint_url=AWS_ENDPOINT_URL,
-            region_name=AWS_REGION,
-            aws_access_key_id="test",
-            aws_secret_access_key="test",
-        )
-        response = self.client.create_queue(QueueName=SHIPPING_QUEUE)
-        self.queue_url = response["QueueUrl"]
+    def __init__(self, pack_messages: bool = SHIPPING_PACK_MESSAGES):
+        self._client = None
+        self._queue_urls = {}
+        self._queue_names = {}
+        self.pack_messages = pack_messages
+        # Policy of the shared shipping queue; see policy_for.
+        self.resilience = get_resilience(SHIPPING_QUEUE, SHIPPING_QUEUE_RATE_LIMIT)
+        # Receipt handle -> (message id, ids of a packed message not settled yet).
+        self._open_packs = OrderedDict()
+        # Message id -> receipt handle of its latest delivery.
+        self._pack_handles = {}
+        self._packs_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_sqs_client()
+        return self._client
+
+    def queue_url_for(self, queue_name: str) -> str:
+        if queue_name not in self._queue_urls:
+            policy = get_resilience(queue_name, SHIPPING_QUEUE_RATE_LIMIT)
+            response = policy.call(self.client.create_queue, QueueName=queue_name)
+            self._queue_names[response["QueueUrl"]] = queue_name
+            self._queue_urls[queue_name] = response["QueueUrl"]
+        return self._queue_urls[queue_name]
+
+    def policy_for(self, queue_url: str):
+        """Each queue has its own rate limit and circuit breaker, so one
+        throttled or failing carrier queue does not hold back the others."""
+        # Queue URLs end in the queue name, which covers URLs read from messages.
+        queue_name = self._queue_names.get(queue_url) or queue_url.rstrip("/").rsplit("/", 1)[-1]
+        return get_resilience(queue_name, SHIPPING_QUEUE_RATE_LIMIT)
+
+    @property
+    def queue_url(self):
+        return self.queue_url_for(SHIPPING_QUEUE)
 
-    def send_new_shipping(self, shipping_id: str):
-        response = self.client.send_message(
-            QueueUrl=self.queue_url,
+    @property
+    def dead_letter_queue_url(self):
+        return self.queue_url_for(SHIPPING_DLQ)
+
+    def send_new_shipping(self, shipping_id: str, queue_name: str = None):
+        queue_url = self.queue_url_for(queue_name) if queue_name else self.queue_url
+        response = self.policy_for(queue_url).call(
+            self.client.send_message,
+            QueueUrl=queue_url,
             MessageBody=shipping_id
         )
 
         return response['MessageId']
 
-    def poll_shipping(self, batch_size: int = 10):
-        messages = self.client.receive_message(
-            QueueUrl=self.queue_url,
+    def send_new_shippings(self, shipping_ids: List[str], queue_name: str = None):
+        """Send many shipping ids, packed into as few messages as possible when
+        packing is enabled. Returns the ids that could not be sent."""
+        queue_url = self.queue_url_for(queue_name) if queue_name else self.queue_url
+        if not self.pack_messages:
+            return self._send_bodies(queue_url, list(shipping_ids))
+        failed = self._send_bodies(queue_url, pack(shipping_ids))
+        return [shipping_id for body in failed for shipping_id in decode(body)]
+
+    def _send_bodies(self, queue_url, bodies, attributes=None) -> list:
+        """Send bodies in batch calls within the SQS entry and size limits.
+        Returns the bodies that failed."""
+        failed = []
+        batch, size = [], 0
+        for body in bodies + [None]:
+            full = body is None or len(batch) == SQS_BATCH_LIMIT or size + len(body) > SQS_MAX_MESSAGE_BYTES
+            if batch and full:
+                entries = [{'Id': str(index), 'MessageBody': item} for index, item in enumerate(batch)]
+                if attributes:
+                    for entry in entries:
+                        entry['MessageAttributes'] = attributes
+                response = self.policy_for(queue_url).call(
+                    self.client.send_message_batch, QueueUrl=queue_url, Entries=entries
+                )
+                failed.extend(batch[int(entry['Id'])] for entry in response.get('Failed', []))
+                batch, size = [], 0
+            if body is not None:
+                batch.append(body)
+                size += len(body)
+        return failed
+
+    def approximate_depth(self, queue_url: str = None) -> int:
+        queue_url = queue_url or self.queue_url
+        response = self.policy_for(queue_url).call(
+            self.client.get_queue_attributes,
+            QueueUrl=queue_url,
+            AttributeNames=['ApproximateNumberOfMessages']
+        )
+
+        return int(response['Attributes']['ApproximateNumberOfMessages'])
+
+    def receive_shipping(self, batch_size: int = 10, wait_time: int = 10, queue_url: str = None):
+        queue_url = queue_url or self.queue_url
+        messages = self.policy_for(queue_url).call(
+            self.client.receive_message,
+            QueueUrl=queue_url,
+            AttributeNames=['ApproximateReceiveCount'],
             MessageAttributeNames=['All'],
             MaxNumberOfMessages=batch_size,
-            WaitTimeSeconds=10
+            WaitTimeSeconds=wait_time
         )
 
-        if 'Messages' not in messages:
-            return []
+        result = []
+        corrupt = []
+        for msg in messages.get('Messages', []):
+            attributes = msg.get('MessageAttributes', {})
+            # Ids retried out of a pack carry the receives they already had.
+            receive_count = int(msg.get('Attributes', {}).get('ApproximateReceiveCount', 1))
+            receive_count += int(attributes.get('receive_count', {}).get('StringValue', 0))
+            source_queue_url = attributes.get('source_queue', {}).get('StringValue')
+
+            body = msg['Body']
+            if not is_packed(body):
+                result.append(ShippingMessage(body, msg['ReceiptHandle'], queue_url, receive_count, source_queue_url))
+                continue
+
+            try:
+                shipping_ids = decode(body)
+            except ValueError as error:
+                # The rest of the batch is still returned; see _reject.
+                logger.warning("Unreadable packed shipping message: %s", error, extra={"queue_url": queue_url})
+                corrupt.append(ShippingMessage(body, msg['ReceiptHandle'], queue_url, receive_count, source_queue_url))
+                continue
+            if len(shipping_ids) > 1:
+                self._open_pack(msg.get('MessageId', msg['ReceiptHandle']), msg['ReceiptHandle'], shipping_ids)
+            result.extend(
+                ShippingMessage(shipping_id, msg['ReceiptHandle'], queue_url, receive_count, source_queue_url,
+                                pack_size=len(shipping_ids))
+                for shipping_id in shipping_ids
+            )
+
+        if corrupt:
+            result.extend(self._reject(corrupt))
+        return result
+
+    def _reject(self, messages) -> list:
+        """Move unreadable messages to the dead-letter queue as they are.
+        Read from the dead-letter queue itself, they are returned unchanged
+        instead, with the raw body as shipping id."""
+        if messages[0].queue_url == self._queue_urls.get(SHIPPING_DLQ):
+            return messages
+        try:
+            self.send_to_dead_letter(messages)
+        except Exception:
+            # They are received again once their visibility expires.
+            logger.exception("Could not dead-letter %d unreadable shipping messages", len(messages))
+        return []
+
+    def poll_shipping(self, batch_size: int = 10, wait_time: int = 10):
+        return [message.shipping_id for message in self.receive_shipping(batch_size, wait_time)]
+
+    def _open_pack(self, message_id, receipt_handle, shipping_ids):
+        with self._packs_lock:
+            # A redelivered pack comes with a new handle and starts over.
+            stale = self._pack_handles.pop(message_id, None)
+            if stale is not None:
+                self._open_packs.pop(stale, None)
+            self._pack_handles[message_id] = receipt_handle
+            self._open_packs[receipt_handle] = (message_id, set(shipping_ids))
+            while len(self._open_packs) > OPEN_PACKS_LIMIT:
+                _, (evicted, _) = self._open_packs.popitem(last=False)
+                self._pack_handles.pop(evicted, None)
+
+    def _settle(self, messages):
+        """Messages whose SQS message is now fully handled and can be deleted.
+        A packed message is settled once every id in it has been."""
+        settled = []
+        with self._packs_lock:
+            for message in messages:
+                if message.pack_size == 1:
+                    settled.append(message)
+                    continue
+                pack = self._open_packs.get(message.receipt_handle)
+                if pack is None:
+                    continue
+                message_id, remaining = pack
+                remaining.discard(message.shipping_id)
+                if not remaining:
+                    del self._open_packs[message.receipt_handle]
+                    del self._pack_handles[message_id]
+                    settled.append(message)
+        return settled
+
+    def _delete(self, messages):
+        for queue_url, queue_messages in _by_queue(messages):
+            for chunk in _chunks(queue_messages):
+                self.policy_for(queue_url).call(
+                    self.client.delete_message_batch,
+                    QueueUrl=queue_url,
+                    Entries=[
+                        {'Id': str(index), 'ReceiptHandle': message.receipt_handle}
+                        for index, message in enumerate(chunk)
+                    ]
+                )
+
+    def _move(self, messages, target_queue_url, record_source: bool = False):
+        """Send messages to another queue and delete the ones that were sent
+        from their source queue. Returns the messages that were moved."""
+        moved = []
+        for chunk in _chunks(messages):
+            entries = [{'Id': str(index), 'MessageBody': message.shipping_id} for index, message in enumerate(chunk)]
+            if record_source:
+                for entry, message in zip(entries, chunk):
+                    entry['MessageAttributes'] = {'source_queue': _attribute(message.queue_url)}
+            response = self.policy_for(target_queue_url).call(
+                self.client.send_message_batch,
+                QueueUrl=target_queue_url,
+                Entries=entries
+            )
+            failed = {entry['Id'] for entry in response.get('Failed', [])}
+            moved.extend(message for index, message in enumerate(chunk) if str(index) not in failed)
+
+        self._delete(self._settle(moved))
+        return moved
+
+    def acknowledge(self, messages):
+        self._delete(self._settle(messages))
+
+    def retry(self, messages):
+        """Hand failed messages back for another attempt.
+
+        Plain messages are redelivered by SQS once their visibility expires.
+        Ids from a packed message are re-sent in a new pack that remembers
+        their receive count, so the rest of the original pack is not
+        redelivered with them. Returns the messages that were re-sent.
+        """
+        groups = defaultdict(list)
+        for message in messages:
+            if message.pack_size > 1:
+                groups[(message.queue_url, message.receive_count)].append(message)
+
+        retried = []
+        for (queue_url, receive_count), group in groups.items():
+            bodies = pack([message.shipping_id for message in group])
+            failed = self._send_bodies(queue_url, bodies, {'receive_count': _attribute(receive_count)})
+            failed_ids = {shipping_id for body in failed for shipping_id in decode(body)}
+            retried.extend(message for message in group if message.shipping_id not in failed_ids)
+
+        self._delete(self._settle(retried))
+        return retried
+
+    def extend_visibility(self, messages, timeout: int):
+        for queue_url, queue_messages in _by_queue(messages):
+            # Ids unpacked from one message share its receipt handle.
+            handles = list(dict.fromkeys(message.receipt_handle for message in queue_messages))
+            for chunk in _chunks(handles):
+                self.policy_for(queue_url).call(
+                    self.client.change_message_visibility_batch,
+                    QueueUrl=queue_url,
+                    Entries=[
+                        {'Id': str(index), 'ReceiptHandle': handle, 'VisibilityTimeout': timeout}
+                        for index, handle in enumerate(chunk)
+                    ]
+                )
+
+    def send_to_dead_letter(self, messages):
+        return self._move(messages, self.dead_letter_queue_url, record_source=True)
+
+    def receive_dead_letters(self, batch_size: int = 10, wait_time: int = 0):
+        return self.receive_shipping(batch_size, wait_time, queue_url=self.dead_letter_queue_url)
 
-        return [msg['Body'] for msg in messages['Messages']]
+    def redrive(self, messages):
+        moved = []
+        for queue_url in {message.source_queue_url or self.queue_url for message in messages}:
+            moved.extend(self._move(
+                [message for message in messages if (message.source_queue_url or self.queue_url) == queue_url],
+                queue_url
+            ))
+        return moved
@@ -0,0 +1,44 @@
+"""Replay shipping messages from the dead-letter queue onto the shipping queue.
+
+Usage: python -m services.redrive [--batch-size 10] [--limit N]
+"""
+import argparse
+
+from .logs import configure_logging, stop_logging
+from .publisher import SQS_BATCH_LIMIT, ShippingPublisher
+
+
+def redrive(publisher: ShippingPublisher, batch_size: int = SQS_BATCH_LIMIT, limit: int = None) -> int:
+    if not 1 <= batch_size <= SQS_BATCH_LIMIT:
+        raise ValueError(f"Batch size must be between 1 and {SQS_BATCH_LIMIT}")
+
+    moved = 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        messages = publisher.receive_dead_letters(size)
+        if not messages:
+            break
+        redriven = len(publisher.redrive(messages))
+        if not redriven:
+            break
+        moved += redriven
+
+    return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=SQS_BATCH_LIMIT)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    try:
+        moved = redrive(ShippingPublisher(), args.batch_size, args.limit)
+    finally:
+        stop_logging()
+    print(f"Redrove {moved} shipping messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Aggregate shipment counts, on-time rates and latency in constant memory.
+
+Usage: python -m services.reporting [--archive DIR] [--format json|csv] [--bucket SECONDS]
+
+Items are streamed from the shipping table (or from an archive export) through
+incremental aggregators, so nothing is held per shipment.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+
+from .archive import MANIFEST_NAME, TERMINAL_STATUSES, read_chunk
+from .repository import ShippingRepository
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class QuantileSketch:
+    """Streaming quantiles with bounded relative error.
+
+    Values are counted in logarithmic buckets, so memory grows with the
+    spread of the values rather than their number and every estimate is
+    within ``relative_accuracy`` of a true value.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-3):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("Relative accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.count = 0
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._zeros = 0
+        self._buckets = Counter()
+
+    def add(self, value: float):
+        if value < 0:
+            raise ValueError("Sketch values must be >= 0")
+        self.count += 1
+        if value < self.min_value:
+            self._zeros += 1
+        else:
+            self._buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+
+    def merge(self, other: "QuantileSketch"):
+        if other.relative_accuracy != self.relative_accuracy or other.min_value != self.min_value:
+            raise ValueError("Only sketches with the same parameters can be merged")
+        self.count += other.count
+        self._zeros += other._zeros
+        self._buckets.update(other._buckets)
+
+    def quantile(self, q: float):
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if rank < seen:
+                return 2 * self._gamma ** index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self._buckets) / (self._gamma + 1)
+
+
+class GroupStats:
+    def __init__(self):
+        self.count = 0
+        self.finished = 0
+        self.on_time = 0
+        self.latency_total = 0.0
+        self.latency = QuantileSketch()
+
+    def add(self, created: datetime, due: datetime, updated: datetime, terminal: bool):
+        self.count += 1
+        if not terminal or updated is None:
+            return
+        self.finished += 1
+        if created is not None:
+            latency = max(0.0, (updated - created).total_seconds())
+            self.latency_total += latency
+            self.latency.add(latency)
+        if due is not None and updated <= due:
+            self.on_time += 1
+
+
+def _parse(value):
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class ShippingReport:
+    """Counts, on-time rate and created-to-finished latency per shipping type
+    and status, plus a histogram of finished shipments per time bucket.
+
+    A shipment is on time when it reached a terminal status before its due
+    date; shipments written before ``updated_date`` was recorded only count
+    towards ``count``.
+    """
+
+    def __init__(self, bucket_seconds: int = 3600):
+        if bucket_seconds < 1:
+            raise ValueError("Bucket size must be >= 1 second")
+        self.bucket_seconds = bucket_seconds
+        self.groups = {}
+        self.histogram = Counter()
+
+    def add(self, item: dict):
+        status = item.get("shipping_status")
+        updated = _parse(item.get("updated_date"))
+        terminal = status in TERMINAL_STATUSES
+        key = (item.get("shipping_type"), status)
+        if key not in self.groups:
+            self.groups[key] = GroupStats()
+        self.groups[key].add(_parse(item.get("created_date")), _parse(item.get("due_date")), updated, terminal)
+        if terminal and updated is not None:
+            bucket = int(updated.timestamp()) // self.bucket_seconds * self.bucket_seconds
+            self.histogram[(bucket, status)] += 1
+
+    def consume(self, items) -> "ShippingReport":
+        for item in items:
+            self.add(item)
+        return self
+
+    def rows(self):
+        for (shipping_type, status), stats in sorted(self.groups.items(), key=lambda entry: tuple(map(str, entry[0]))):
+            row = {
+                "shipping_type": shipping_type,
+                "status": status,
+                "count": stats.count,
+                "finished": stats.finished,
+                "on_time": stats.on_time,
+                "on_time_rate": stats.on_time / stats.finished if stats.finished else None,
+                "latency_mean": stats.latency_total / stats.latency.count if stats.latency.count else None,
+            }
+            for q in QUANTILES:
+                row[f"latency_p{round(q * 100)}"] = stats.latency.quantile(q)
+            yield row
+
+    def to_dict(self) -> dict:
+        return {
+            "bucket_seconds": self.bucket_seconds,
+            "groups": list(self.rows()),
+            "histogram": [
+                {
+                    "bucket": datetime.fromtimestamp(bucket, timezone.utc).isoformat(),
+                    "status": status,
+                    "count": count,
+                }
+                for (bucket, status), count in sorted(self.histogram.items())
+            ],
+        }
+
+    def write_json(self, stream):
+        json.dump(self.to_dict(), stream, indent=2, ensure_ascii=False)
+
+    def write_csv(self, stream):
+        rows = list(self.rows())
+        fields = ["shipping_type", "status", "count", "finished", "on_time", "on_time_rate", "latency_mean"]
+        fields += [f"latency_p{round(q * 100)}" for q in QUANTILES]
+        writer = csv.DictWriter(stream, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def iter_table(repository: ShippingRepository):
+    for items, _ in repository.scan_shippings():
+        yield from items
+
+
+def iter_archive(output_dir: str):
+    with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as source:
+        manifest = json.load(source)
+    for chunk in manifest["chunks"]:
+        yield from read_chunk(os.path.join(output_dir, chunk["file"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--archive", help="read an archive export instead of the shipping table")
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    parser.add_argument("--bucket", type=int, default=3600, help="histogram bucket size in seconds")
+    args = parser.parse_args(argv)
+
+    items = iter_archive(args.archive) if args.archive else iter_table(ShippingRepository())
+    report = ShippingReport(args.bucket).consume(items)
+    if args.format == "csv":
+        report.write_csv(sys.stdout)
+    else:
+        report.write_json(sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
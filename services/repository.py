@@ -1,26 +1,99 @@
-from .config import SHIPPING_TABLE_NAME
+from .config import SHIPPING_TABLE_NAME, SHIPPING_TABLE_RATE_LIMIT
 from .db import get_dynamodb_resource
+from .resilience import error_code, get_resilience
 
-from uuid import uuid4
+import time
+from uuid import NAMESPACE_URL, uuid5
 from datetime import datetime, timezone
 
+# Shipping ids are derived from the order id, so a retried order maps onto the
+# shipment that was already written for it.
+SHIPPING_NAMESPACE = uuid5(NAMESPACE_URL, "eshop/shipping")
+# DynamoDB limits per BatchGetItem and BatchWriteItem call.
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+
+
+class ShippingAlreadyExists(Exception):
+    def __init__(self, shipping_id):
+        super().__init__(f"Shipping {shipping_id} already exists")
+        self.shipping_id = shipping_id
+
+
+class UnprocessedItemsError(RuntimeError):
+    def __init__(self, count):
+        super().__init__(f"{count} batch entries were still unprocessed after retrying")
+        self.count = count
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def batch_requests(resilience, operation, request_items, unprocessed_key):
+    """Run a DynamoDB batch call and resubmit whatever it left unprocessed,
+    backing off between rounds. Yields each response."""
+    backoff = resilience.backoff
+    for attempt in range(backoff.max_attempts):
+        response = resilience.call(operation, RequestItems=request_items)
+        yield response
+        request_items = response.get(unprocessed_key)
+        if not request_items:
+            return
+        time.sleep(backoff.delay(attempt))
+    # Writes are lists of requests per table, reads hold them under "Keys".
+    raise UnprocessedItemsError(sum(
+        len(entries["Keys"]) if isinstance(entries, dict) else len(entries)
+        for entries in request_items.values()
+    ))
+
 
 class ShippingRepository:
 
 
     def __init__(self):
-        dynamo_resource = get_dynamodb_resource()
-        self.table = dynamo_resource.Table(SHIPPING_TABLE_NAME)
+        self._resource = None
+        self._table = None
+        self.resilience = get_resilience(SHIPPING_TABLE_NAME, SHIPPING_TABLE_RATE_LIMIT)
+
+    @property
+    def resource(self):
+        if self._resource is None:
+            self._resource = get_dynamodb_resource()
+        return self._resource
 
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = self.resource.Table(SHIPPING_TABLE_NAME)
+        return self._table
+
+    @staticmethod
+    def shipping_id_for(order_id) -> str:
+        return str(uuid5(SHIPPING_NAMESPACE, str(order_id)))
+
+    def _batch(self, operation, request_items, unprocessed_key):
+        return batch_requests(self.resilience, operation, request_items, unprocessed_key)
 
     def get_shipping(self, shipping_id):
-        response = self.table.get_item(Key={"shipping_id": shipping_id})
+        response = self.resilience.call(self.table.get_item, Key={"shipping_id": shipping_id})
         return response.get("Item")
 
-    def create_shipping(self, shipping_type: str, product_ids: list, order_id: str, status: str, due_date: datetime):
-        shipping_id = str(uuid4())
-        item = {
-            "shipping_id": shipping_id,
+    def get_shippings(self, shipping_ids) -> dict:
+        """Fetch many shippings with BatchGetItem. Returns shipping id -> item
+        for the ids that exist."""
+        items = {}
+        for chunk in _chunks(list(dict.fromkeys(shipping_ids)), BATCH_GET_LIMIT):
+            request = {SHIPPING_TABLE_NAME: {"Keys": [{"shipping_id": shipping_id} for shipping_id in chunk]}}
+            for response in self._batch(self.resource.batch_get_item, request, "UnprocessedKeys"):
+                for item in response.get("Responses", {}).get(SHIPPING_TABLE_NAME, []):
+                    items[item["shipping_id"]] = item
+        return items
+
+    def new_shipping(self, shipping_type: str, product_ids: list, order_id: str, status: str, due_date: datetime):
+        return {
+            "shipping_id": self.shipping_id_for(order_id),
             "shipping_type": shipping_type,
             "order_id": order_id,
             "product_ids": ",".join(product_ids),
@@ -28,18 +101,82 @@ class ShippingRepository:
             "created_date": datetime.now(timezone.utc).isoformat(),
             "due_date": due_date.replace(tzinfo=timezone.utc).isoformat()
         }
-        self.table.put_item(Item=item)
+
+    def put_shippings(self, items):
+        """Write whole items with BatchWriteItem. Unlike create_shipping this
+        is unconditional, so callers check for existing items first."""
+        for chunk in _chunks(list(items), BATCH_WRITE_LIMIT):
+            request = {SHIPPING_TABLE_NAME: [{"PutRequest": {"Item": item}} for item in chunk]}
+            for _ in self._batch(self.resource.batch_write_item, request, "UnprocessedItems"):
+                pass
+
+    def delete_shippings(self, shipping_ids):
+        for chunk in _chunks(list(dict.fromkeys(shipping_ids)), BATCH_WRITE_LIMIT):
+            request = {SHIPPING_TABLE_NAME: [
+                {"DeleteRequest": {"Key": {"shipping_id": shipping_id}}} for shipping_id in chunk
+            ]}
+            for _ in self._batch(self.resource.batch_write_item, request, "UnprocessedItems"):
+                pass
+
+    def scan_shippings(self, segment: int = 0, total_segments: int = 1, statuses=None, start_key=None):
+        """Scan one segment of the table page by page, optionally keeping only
+        the given statuses. Yields (items, last_evaluated_key) per page; the
+        key is None after the last page and can be passed back as
+        ``start_key`` to resume."""
+        kwargs = {"Segment": segment, "TotalSegments": total_segments}
+        if statuses:
+            placeholders = [f":status{index}" for index in range(len(statuses))]
+            kwargs["FilterExpression"] = f"shipping_status IN ({', '.join(placeholders)})"
+            kwargs["ExpressionAttributeValues"] = dict(zip(placeholders, statuses))
+        while True:
+            if start_key is not None:
+                kwargs["ExclusiveStartKey"] = start_key
+            response = self.resilience.call(self.table.scan, **kwargs)
+            start_key = response.get("LastEvaluatedKey")
+            yield response.get("Items", []), start_key
+            if start_key is None:
+                return
+
+    def create_shipping(self, shipping_type: str, product_ids: list, order_id: str, status: str, due_date: datetime):
+        item = self.new_shipping(shipping_type, product_ids, order_id, status, due_date)
+        shipping_id = item["shipping_id"]
+        try:
+            self.resilience.call(
+                self.table.put_item,
+                Item=item,
+                ConditionExpression="attribute_not_exists(shipping_id)"
+            )
+        except Exception as error:
+            if error_code(error) == "ConditionalCheckFailedException":
+                raise ShippingAlreadyExists(shipping_id) from error
+            raise
         return shipping_id
 
-    def update_shipping_status(self, shipping_id, status):
-        response = self.table.update_item(
-            Key={
-                'shipping_id': shipping_id,
-            },
-            UpdateExpression='SET shipping_status = :sh_status',
-            ExpressionAttributeValues={
-                ':sh_status': status
-            }
-        )
+    def update_shipping_status(self, shipping_id, status, expected_status=None):
+        """Set the status and updated date. Given ``expected_status`` the
+        update only applies while the shipping still has that status, and
+        None is returned when it no longer does."""
+        values = {
+            ':sh_status': status,
+            ':updated': datetime.now(timezone.utc).isoformat()
+        }
+        kwargs = {}
+        if expected_status is not None:
+            values[':expected'] = expected_status
+            kwargs['ConditionExpression'] = 'shipping_status = :expected'
+        try:
+            response = self.resilience.call(
+                self.table.update_item,
+                Key={
+                    'shipping_id': shipping_id,
+                },
+                UpdateExpression='SET shipping_status = :sh_status, updated_date = :updated',
+                ExpressionAttributeValues=values,
+                **kwargs
+            )
+        except Exception as error:
+            if expected_status is not None and error_code(error) == "ConditionalCheckFailedException":
+                return None
+            raise
 
         return response
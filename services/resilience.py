@@ -0,0 +1,259 @@
+import random
+import threading
+import time
+
+THROTTLING_ERRORS = frozenset({
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+    "ThrottlingException",
+    "Throttling",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "SlowDown",
+})
+TRANSIENT_ERRORS = frozenset({
+    "InternalServerError",
+    "InternalFailure",
+    "InternalError",
+    "ServiceUnavailable",
+    "RequestTimeout",
+    "RequestTimeoutException",
+})
+# botocore raises these without an error response, matched by name so that
+# botocore itself does not have to be imported here.
+CONNECTION_ERRORS = frozenset({
+    "EndpointConnectionError",
+    "ConnectTimeoutError",
+    "ReadTimeoutError",
+    "ConnectionClosedError",
+})
+
+
+def error_code(error: Exception):
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code")
+
+
+def is_throttling(error: Exception) -> bool:
+    return error_code(error) in THROTTLING_ERRORS
+
+
+def is_retryable(error: Exception) -> bool:
+    return (
+        is_throttling(error)
+        or error_code(error) in TRANSIENT_ERRORS
+        or type(error).__name__ in CONNECTION_ERRORS
+    )
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def is_infrastructure_error(error: Exception) -> bool:
+    """Errors that say nothing about the request itself, such as an open
+    circuit or retries exhausted on throttling or an unreachable service."""
+    return isinstance(error, CircuitOpenError) or is_retryable(error)
+
+
+class Backoff:
+    """Exponential backoff with full jitter."""
+
+    def __init__(self, base: float = 0.05, cap: float = 5.0, max_attempts: int = 5):
+        if max_attempts < 1:
+            raise ValueError("Backoff needs at least one attempt")
+        self.base = base
+        self.cap = cap
+        self.max_attempts = max_attempts
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Client-side rate limiter that halves its rate when throttled and
+    recovers additively on success (AIMD).
+
+    Instead of counting fractional tokens the bucket tracks the time the next
+    request may start, so each caller computes its wait exactly once.
+    """
+
+    def __init__(self, rate: float, burst: float = None, min_rate: float = None, clock=time.monotonic,
+                 sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("Rate must be greater than 0")
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 20
+        self.capacity = max(1.0, burst or rate)
+        self._clock = clock
+        self._sleep = sleep
+        # Start with a full bucket: the burst is already available.
+        self._next_free = clock() - (self.capacity - 1) / rate
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = self._clock()
+            interval = 1 / self.rate
+            start = max(self._next_free, now - (self.capacity - 1) * interval)
+            self._next_free = start + interval
+            wait = start - now
+        if wait > 0:
+            self._sleep(wait)
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failed calls. Once
+    ``reset_timeout`` has passed a single probe call is let through; the
+    circuit closes if it succeeds and opens again if it fails."""
+
+    CLOSED: str = 'closed'
+    OPEN: str = 'open'
+    HALF_OPEN: str = 'half-open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self):
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class Resilience:
+    """Retry, rate limiting and circuit breaking around calls to one table or queue.
+
+    Throttling only slows the token bucket down. The breaker counts whole
+    calls that still fail with a transient or connection error after all
+    retries.
+    """
+
+    def __init__(self, name: str, rate: float, backoff: Backoff = None, breaker: CircuitBreaker = None,
+                 sleep=time.sleep):
+        self.name = name
+        self.bucket = TokenBucket(rate, sleep=sleep) if rate > 0 else None
+        self.backoff = backoff or Backoff()
+        self.breaker = breaker or CircuitBreaker()
+        self.calls = 0
+        self.retries = 0
+        self.throttles = 0
+        self.rejected = 0
+        self._sleep = sleep
+
+    def call(self, operation, *args, **kwargs):
+        self.calls += 1
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+
+        try:
+            result = self._attempt(operation, args, kwargs)
+        except Exception as error:
+            if is_throttling(error):
+                self.breaker.release()
+            elif is_retryable(error):
+                self.breaker.record_failure()
+            else:
+                # The service answered, it just rejected this request.
+                self.breaker.record_success()
+            raise
+
+        self.breaker.record_success()
+        return result
+
+    def _attempt(self, operation, args, kwargs):
+        for attempt in range(self.backoff.max_attempts):
+            if self.bucket is not None:
+                self.bucket.acquire()
+
+            try:
+                result = operation(*args, **kwargs)
+            except Exception as error:
+                if not is_retryable(error):
+                    raise
+                if is_throttling(error):
+                    self.throttles += 1
+                    if self.bucket is not None:
+                        self.bucket.on_throttle()
+                if attempt + 1 == self.backoff.max_attempts:
+                    raise
+                self.retries += 1
+                self._sleep(self.backoff.delay(attempt))
+                continue
+
+            if self.bucket is not None:
+                self.bucket.on_success()
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "state": self.breaker.state,
+            "trips": self.breaker.trips,
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttles": self.throttles,
+            "rejected": self.rejected,
+            "rate": self.bucket.rate if self.bucket is not None else None,
+        }
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_resilience(name: str, rate: float) -> Resilience:
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Resilience(name, rate)
+        return _registry[name]
+
+
+def resilience_stats() -> list:
+    with _registry_lock:
+        return [policy.stats() for policy in _registry.values()]
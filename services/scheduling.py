@@ -0,0 +1,119 @@
+import heapq
+import itertools
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from .config import (
+    SHIPPING_SCHEDULER_CAPACITY,
+    SHIPPING_SCHEDULER_MAX_AGE,
+    SHIPPING_SCHEDULER_NORMAL_WEIGHT,
+    SHIPPING_SCHEDULER_URGENT_WEIGHT,
+    SHIPPING_SCHEDULER_URGENT_WINDOW,
+)
+
+
+@dataclass(order=True)
+class ScheduledShipping:
+    due_date: datetime
+    sequence: int
+    item: Any = field(compare=False)
+    urgent: bool = field(default=False, compare=False)
+    queued_at: datetime = field(default=None, compare=False)
+
+
+class DeadlineScheduler:
+    """Bounded earliest-deadline-first buffer for the shipping consumer.
+
+    Shipments due within ``urgent_window`` move to the urgent lane. Both lanes
+    are ordered by due date and drawn from by smooth weighted round robin, so
+    normal shipments still progress while urgent ones are preferred.
+    Nothing is held longer than ``max_age``.
+    """
+
+    def __init__(self, capacity: int = SHIPPING_SCHEDULER_CAPACITY,
+                 urgent_window: timedelta = timedelta(seconds=SHIPPING_SCHEDULER_URGENT_WINDOW),
+                 urgent_weight: int = SHIPPING_SCHEDULER_URGENT_WEIGHT,
+                 normal_weight: int = SHIPPING_SCHEDULER_NORMAL_WEIGHT,
+                 max_age: timedelta = timedelta(seconds=SHIPPING_SCHEDULER_MAX_AGE),
+                 clock=lambda: datetime.now(timezone.utc)):
+        if capacity < 1 or urgent_weight < 1 or normal_weight < 1:
+            raise ValueError("Capacity and lane weights must be >= 1")
+        self.capacity = capacity
+        self.urgent_window = urgent_window
+        self.urgent_weight = urgent_weight
+        self.normal_weight = normal_weight
+        self.max_age = max_age
+        self.missed = 0
+        self.saved = 0
+        self.on_time = 0
+        self._clock = clock
+        self._urgent = []
+        self._normal = []
+        self._credits = {"urgent": 0, "normal": 0}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._urgent) + len(self._normal)
+
+    def push(self, due_date: datetime, item):
+        with self._lock:
+            entry = ScheduledShipping(due_date, next(self._sequence), item, queued_at=self._clock())
+            heapq.heappush(self._normal, entry)
+
+    def _promote(self):
+        horizon = self._clock() + self.urgent_window
+        while self._normal and self._normal[0].due_date <= horizon:
+            entry = heapq.heappop(self._normal)
+            entry.urgent = True
+            heapq.heappush(self._urgent, entry)
+
+    def pop(self) -> ScheduledShipping:
+        with self._lock:
+            return self._pop()
+
+    def _pop(self) -> ScheduledShipping:
+        self._promote()
+        if not self._urgent:
+            return heapq.heappop(self._normal)
+        if not self._normal:
+            return heapq.heappop(self._urgent)
+
+        self._credits["urgent"] += self.urgent_weight
+        self._credits["normal"] += self.normal_weight
+        lane = max(self._credits, key=self._credits.get)
+        self._credits[lane] -= self.urgent_weight + self.normal_weight
+        return heapq.heappop(self._urgent if lane == "urgent" else self._normal)
+
+    def drain(self, incoming: int) -> list:
+        """Entries to process now: as many as just arrived plus any overflow
+        above capacity, or everything once nothing new is arriving or an
+        entry has waited ``max_age``."""
+        # Counted and popped under one lock, as lanes drain concurrently.
+        with self._lock:
+            buffered = len(self)
+            count = buffered if incoming == 0 or self._expired() else max(incoming, buffered - self.capacity)
+            return [self._pop() for _ in range(min(count, buffered))]
+
+    def _expired(self) -> bool:
+        deadline = self._clock() - self.max_age
+        return any(entry.queued_at <= deadline for entry in itertools.chain(self._urgent, self._normal))
+
+    def record(self, entry: ScheduledShipping):
+        with self._lock:
+            if self._clock() > entry.due_date:
+                self.missed += 1
+            elif entry.urgent:
+                self.saved += 1
+            else:
+                self.on_time += 1
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self),
+            "missed": self.missed,
+            "saved": self.saved,
+            "on_time": self.on_time,
+        }
@@ -1,7 +1,21 @@
-from .repository import ShippingRepository
+import logging
+import threading
+from collections import defaultdict
+
+from .repository import ShippingAlreadyExists, ShippingRepository
 from .publisher import ShippingPublisher
+from .profiling import BatchProfiler
+from .heartbeat import VisibilityHeartbeat
+from .idempotency import IdempotencyCache
+from .dedup import ShippingDeduplicator
+from .carriers import CARRIERS
+from .resilience import is_infrastructure_error
+from .status import StatusWatcher
+from .config import SHIPPING_LOG_SAMPLE_RATE, SHIPPING_MAX_RECEIVES
 from datetime import datetime, timezone
 
+logger = logging.getLogger(__name__)
+
 
 class ShippingService:
     SHIPPING_CREATED: str = 'created'
@@ -9,39 +23,243 @@ class ShippingService:
     SHIPPING_COMPLETED: str = 'completed'
     SHIPPING_FAILED: str = 'failed'
 
-    def __init__(self, repository, publisher):
+    def __init__(self, repository, publisher, profiler=None, heartbeat=None, max_receives=SHIPPING_MAX_RECEIVES,
+                 idempotency=None, dedup=None, carriers=None, scheduler=None):
         self.repository = repository
         self.publisher = publisher
+        self.carriers = carriers if carriers is not None else CARRIERS
+        self.idempotency = idempotency if idempotency is not None else IdempotencyCache()
+        self.dedup = dedup if dedup is not None else ShippingDeduplicator.from_config()
+        self.profiler = profiler if profiler is not None else BatchProfiler.from_config()
+        self.heartbeat = heartbeat if heartbeat is not None else VisibilityHeartbeat(publisher)
+        self.max_receives = max_receives
+        self.scheduler = scheduler
+        self.dead_lettered = 0
+        self._watcher = None
+        self._watcher_lock = threading.Lock()
 
     @staticmethod
     def list_available_shipping_type():
-        return ['Нова Пошта', 'Укр Пошта', 'Meest Express', 'Самовивіз']
+        return list(CARRIERS.names)
 
     def create_shipping(self, shipping_type, product_ids, order_id, due_date):
-        if shipping_type not in self.list_available_shipping_type():
+        shipping_id = self.idempotency.get(order_id)
+        if shipping_id is not None:
+            return shipping_id
+
+        if shipping_type not in self.carriers:
             raise ValueError("Shipping type is not available")
 
         if due_date <= datetime.now(timezone.utc):
             raise ValueError("Shipping due datetime must be greater than datetime now")
 
-        shipping_id = self.repository.create_shipping(shipping_type, product_ids, order_id, self.SHIPPING_CREATED, due_date)
+        try:
+            shipping_id = self.repository.create_shipping(shipping_type, product_ids, order_id, self.SHIPPING_CREATED, due_date)
+        except ShippingAlreadyExists as error:
+            shipping_id = error.shipping_id
+            existing = self.repository.get_shipping(shipping_id)
+            # An earlier attempt that stopped before publishing is finished below.
+            if existing is not None and existing['shipping_status'] != self.SHIPPING_CREATED:
+                self.idempotency.put(order_id, shipping_id)
+                return shipping_id
 
-        self.publisher.send_new_shipping(shipping_id)
-        self.repository.update_shipping_status(shipping_id, self.SHIPPING_IN_PROGRESS)
+        queue_name = self.carriers[shipping_type].queue_name
+        if queue_name:
+            self.publisher.send_new_shipping(shipping_id, queue_name=queue_name)
+        else:
+            self.publisher.send_new_shipping(shipping_id)
+        self._update_status(shipping_id, self.SHIPPING_IN_PROGRESS)
+        self.idempotency.put(order_id, shipping_id)
 
         return shipping_id
 
+    def create_shippings(self, requests):
+        """Create shippings for many orders with batched reads, writes and sends.
+
+        ``requests`` holds (shipping_type, product_ids, order_id, due_date)
+        tuples. Returns, in the same order, the shipping id of each order or
+        the exception that stopped it.
+        """
+        results = [None] * len(requests)
+        pending = {}
+        now = datetime.now(timezone.utc)
+        for index, (shipping_type, product_ids, order_id, due_date) in enumerate(requests):
+            shipping_id = self.idempotency.get(order_id)
+            if shipping_id is not None:
+                results[index] = shipping_id
+            elif shipping_type not in self.carriers:
+                results[index] = ValueError("Shipping type is not available")
+            elif due_date <= now:
+                results[index] = ValueError("Shipping due datetime must be greater than datetime now")
+            else:
+                item = self.repository.new_shipping(shipping_type, product_ids, order_id, self.SHIPPING_CREATED, due_date)
+                # The same order twice in one batch maps onto one shipping.
+                pending.setdefault(item['shipping_id'], (item, []))[1].append(index)
+
+        def settle(shipping_id, outcome):
+            item, indexes = pending.pop(shipping_id)
+            for index in indexes:
+                results[index] = outcome
+            if not isinstance(outcome, Exception):
+                self.idempotency.put(item['order_id'], shipping_id)
+
+        try:
+            existing = self.repository.get_shippings(list(pending))
+            new_items = []
+            for shipping_id, (item, indexes) in list(pending.items()):
+                found = existing.get(shipping_id)
+                if found is None:
+                    new_items.append(item)
+                elif found['shipping_status'] != self.SHIPPING_CREATED:
+                    settle(shipping_id, shipping_id)
+                else:
+                    # An earlier attempt that stopped before publishing is finished below.
+                    pending[shipping_id] = (found, indexes)
+            self.repository.put_shippings(new_items)
+        except Exception as error:
+            for shipping_id in list(pending):
+                settle(shipping_id, error)
+            return results
+
+        by_queue = defaultdict(list)
+        for shipping_id, (item, _) in pending.items():
+            by_queue[self.carriers[item['shipping_type']].queue_name].append(shipping_id)
+        for queue_name, shipping_ids in by_queue.items():
+            try:
+                failed = self.publisher.send_new_shippings(shipping_ids, queue_name)
+            except Exception:
+                failed = shipping_ids
+                logger.exception("Failed to publish %d shippings", len(shipping_ids))
+            for shipping_id in failed:
+                # Left as created, so placing the order again publishes it.
+                settle(shipping_id, RuntimeError(f"Shipping {shipping_id} could not be published"))
+
+        for shipping_id in list(pending):
+            try:
+                # Conditional, as a consumer may already have finished the shipping.
+                updated = self.repository.update_shipping_status(
+                    shipping_id, self.SHIPPING_IN_PROGRESS, expected_status=self.SHIPPING_CREATED
+                )
+            except Exception as error:
+                settle(shipping_id, error)
+                continue
+            if updated is not None and self._watcher is not None:
+                self._watcher.notify(shipping_id, self.SHIPPING_IN_PROGRESS)
+            settle(shipping_id, shipping_id)
+        return results
+
     def process_shipping_batch(self):
+        return self.process_messages(self.publisher.receive_shipping())
+
+    def process_messages(self, messages):
+        if self.profiler is None:
+            return self._process_messages(messages)
+
+        with self.profiler.batch():
+            return self._process_messages(messages)
+
+    def _process_messages(self, messages):
         result = []
-        shipping = self.publisher.poll_shipping()
-        for shipping_id in shipping:
-            shipping = self.process_shipping(shipping_id)
-            result.append(shipping)
+        processed = []
+        dead = []
+        failed = []
+        handled = []
+        self.heartbeat.track(messages)
+        try:
+            pending = []
+            for message in messages:
+                if self.dedup.is_duplicate(message.shipping_id):
+                    processed.append(message)
+                else:
+                    pending.append(message)
+            handled.extend(processed)
+
+            if self.scheduler is None:
+                ready = [(message, None, None) for message in pending]
+            else:
+                ready = self._schedule(pending, handled, dead, failed)
 
+            for message, shipping, entry in ready:
+                handled.append(message)
+                try:
+                    outcome = self.process_shipping(message.shipping_id, shipping)
+                except Exception as error:
+                    self._record_failure(message, error, dead, failed)
+                    continue
+                if entry is not None:
+                    self.scheduler.record(entry)
+                self.dedup.mark(message.shipping_id)
+                result.append(outcome)
+                processed.append(message)
+                logger.info("Processed shipping %s", message.shipping_id, extra={
+                    "shipping_id": message.shipping_id,
+                    "receive_count": message.receive_count,
+                    "sample_rate": SHIPPING_LOG_SAMPLE_RATE,
+                })
+        finally:
+            # Messages still buffered by the scheduler stay tracked.
+            self.heartbeat.release(handled)
+
+        if processed:
+            self.publisher.acknowledge(processed)
+        if failed:
+            self.publisher.retry(failed)
+        if dead:
+            moved = self.publisher.send_to_dead_letter(dead)
+            self.dead_lettered += len(moved)
+            logger.warning("Moved %d shipping messages to the dead-letter queue", len(moved),
+                           extra={"dead_lettered": len(moved)})
+
+        logger.debug("Processed shipping batch", extra={
+            "received": len(messages),
+            "processed": len(processed),
+            "failed": len(failed),
+            "dead": len(dead),
+        })
         return result
 
-    def process_shipping(self, shipping_id):
-        shipping = self.repository.get_shipping(shipping_id)
+    def flush_scheduled(self):
+        """Process whatever the scheduler still holds, e.g. when the consumer
+        stops, so buffered messages are not kept invisible indefinitely."""
+        if self.scheduler is None or not len(self.scheduler):
+            return []
+        return self.process_messages([])
+
+    def _schedule(self, messages, handled, dead, failed):
+        for message in messages:
+            try:
+                shipping = self.repository.get_shipping(message.shipping_id)
+                if shipping is None:
+                    raise ValueError(f"Shipping {message.shipping_id} does not exist")
+            except Exception as error:
+                handled.append(message)
+                self._record_failure(message, error, dead, failed)
+                continue
+            self.scheduler.push(datetime.fromisoformat(shipping['due_date']), (message, shipping))
+
+        return [(*entry.item, entry) for entry in self.scheduler.drain(len(messages))]
+
+    def _record_failure(self, message, error, dead, failed):
+        if is_infrastructure_error(error):
+            # Outages and throttling are not the shipment's fault, so they never
+            # count towards dead-lettering; the message is redelivered instead.
+            logger.warning("Shipping %s deferred: %s", message.shipping_id, error,
+                           extra={"shipping_id": message.shipping_id, "receive_count": message.receive_count})
+            failed.append(message)
+            return
+
+        logger.exception("Failed to process shipping %s (receive %d)", message.shipping_id, message.receive_count,
+                         extra={"shipping_id": message.shipping_id, "receive_count": message.receive_count})
+        if message.receive_count >= self.max_receives:
+            dead.append(message)
+        else:
+            failed.append(message)
+
+    def process_shipping(self, shipping_id, shipping=None):
+        if shipping is None:
+            shipping = self.repository.get_shipping(shipping_id)
+        if shipping is None:
+            raise ValueError(f"Shipping {shipping_id} does not exist")
         if datetime.fromisoformat(shipping['due_date']) < datetime.now(timezone.utc):
             return self.fail_shipping(shipping_id)
 
@@ -52,10 +270,35 @@ class ShippingService:
 
         return shipping['shipping_status']
 
+    def check_statuses(self, shipping_ids):
+        """Statuses of many shipments by id, fetched with batched reads.
+        Shipments that do not exist are left out."""
+        return {
+            shipping_id: shipping['shipping_status']
+            for shipping_id, shipping in self.repository.get_shippings(shipping_ids).items()
+        }
+
+    @property
+    def watcher(self):
+        with self._watcher_lock:
+            if self._watcher is None:
+                self._watcher = StatusWatcher(self.check_statuses)
+            return self._watcher
+
+    def wait_for_status(self, shipping_ids, targets, timeout):
+        return self.watcher.wait(shipping_ids, targets, timeout)
+
+    def _update_status(self, shipping_id, status):
+        response = self.repository.update_shipping_status(shipping_id, status)
+        # Waiters in this process see the change without another poll.
+        if self._watcher is not None:
+            self._watcher.notify(shipping_id, status)
+        return response
+
     def fail_shipping(self, shipping_id):
-        response = self.repository.update_shipping_status(shipping_id, self.SHIPPING_FAILED)
+        response = self._update_status(shipping_id, self.SHIPPING_FAILED)
         return response['ResponseMetadata']
 
     def complete_shipping(self, shipping_id):
-        response = self.repository.update_shipping_status(shipping_id, self.SHIPPING_COMPLETED)
+        response = self._update_status(shipping_id, self.SHIPPING_COMPLETED)
         return response['ResponseMetadata']
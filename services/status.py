@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+from .config import SHIPPING_STATUS_POLL_MAX, SHIPPING_STATUS_POLL_MIN
+
+logger = logging.getLogger(__name__)
+
+
+class StatusWatcher:
+    """Shares one batched status poll between every caller waiting on shipments.
+
+    Waiters register the ids they care about and a single background thread
+    fetches all watched ids with one ``fetch`` call per round. The interval
+    between rounds doubles while nothing changes and drops back to the minimum
+    as soon as something does. Statuses pushed through ``notify`` wake waiters
+    without waiting for the next round.
+    """
+
+    def __init__(self, fetch, min_interval: float = SHIPPING_STATUS_POLL_MIN,
+                 max_interval: float = SHIPPING_STATUS_POLL_MAX, clock=time.monotonic):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Poll intervals must satisfy 0 < min_interval <= max_interval")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.polls = 0
+        self._fetch = fetch
+        self._clock = clock
+        self._statuses = {}
+        self._watched = Counter()
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def notify(self, shipping_id: str, status: str):
+        with self._condition:
+            if shipping_id in self._watched:
+                self._statuses[shipping_id] = status
+                self._condition.notify_all()
+
+    def wait(self, shipping_ids, targets, timeout: float) -> dict:
+        """Block until every shipment has one of ``targets`` or ``timeout``
+        passes. Returns the last seen status of each shipment, None for
+        shipments that were not found (yet)."""
+        targets = {targets} if isinstance(targets, str) else set(targets)
+        shipping_ids = list(dict.fromkeys(shipping_ids))
+        deadline = self._clock() + timeout
+        with self._condition:
+            self._watched.update(shipping_ids)
+            self._start()
+            try:
+                while not all(self._statuses.get(shipping_id) in targets for shipping_id in shipping_ids):
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                return {shipping_id: self._statuses.get(shipping_id) for shipping_id in shipping_ids}
+            finally:
+                self._watched.subtract(shipping_ids)
+                for shipping_id in shipping_ids:
+                    if self._watched[shipping_id] <= 0:
+                        del self._watched[shipping_id]
+                        self._statuses.pop(shipping_id, None)
+
+    def _start(self):
+        # New ids are fetched straight away rather than after the current backoff.
+        self.interval = self.min_interval
+        self._wake.set()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="shipping-status-watcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            with self._condition:
+                shipping_ids = list(self._watched)
+                if not shipping_ids:
+                    self._thread = None
+                    return
+            try:
+                statuses = self._fetch(shipping_ids)
+            except Exception:
+                logger.exception("Failed to poll the status of %d shipments", len(shipping_ids))
+                statuses = None
+            self.polls += 1
+
+            with self._condition:
+                changed = False
+                if statuses is not None:
+                    for shipping_id in shipping_ids:
+                        if shipping_id in self._watched and self._statuses.get(shipping_id) != statuses.get(shipping_id):
+                            self._statuses[shipping_id] = statuses.get(shipping_id)
+                            changed = True
+                if changed:
+                    self.interval = self.min_interval
+                    self._condition.notify_all()
+                else:
+                    self.interval = min(self.max_interval, self.interval * 2)
+                interval = self.interval
+            self._wake.wait(interval)
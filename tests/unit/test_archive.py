@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from services.archive import ShippingArchiver, read_chunk
+from services.repository import ShippingRepository
+
+
+class FakeRepository:
+    """Pages of two items per segment; ``fail_after`` pages raise once, and
+    so does the ``fail_deletes``-th delete."""
+
+    def __init__(self, segments, fail_after=None, fail_deletes=None):
+        self.segments = segments
+        self.fail_after = fail_after
+        self.fail_deletes = fail_deletes
+        self.deletes = 0
+        self.deleted = []
+
+    def scan_shippings(self, segment, total_segments, statuses, start_key=None):
+        items = self.segments[segment]
+        start = 0 if start_key is None else start_key["offset"]
+        if not items:
+            yield [], None
+        for offset in range(start, len(items), 2):
+            if self.fail_after is not None and offset >= self.fail_after:
+                self.fail_after = None
+                raise ConnectionError("scan interrupted")
+            end = offset + 2
+            yield items[offset:end], {"offset": end} if end < len(items) else None
+
+    def delete_shippings(self, shipping_ids):
+        self.deletes += 1
+        if self.deletes == self.fail_deletes:
+            raise ConnectionError("delete interrupted")
+        self.deleted.extend(shipping_ids)
+
+
+def shipments(prefix, count):
+    return [{"shipping_id": f"{prefix}{index}", "shipping_status": "completed", "weight": Decimal("1.5")}
+            for index in range(count)]
+
+
+class TestShippingArchiver(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.output = self.directory.name
+
+    def archived(self):
+        with open(os.path.join(self.output, "manifest.json"), encoding="utf-8") as source:
+            manifest = json.load(source)
+        return manifest, [
+            item["shipping_id"]
+            for chunk in manifest["chunks"]
+            for item in read_chunk(os.path.join(self.output, chunk["file"]))
+        ]
+
+    def test_archives_segments_in_chunks_and_deletes_verified_items(self):
+        repository = FakeRepository({0: shipments("a", 5), 1: shipments("b", 3)})
+        stats = ShippingArchiver(repository, self.output, segments=2, chunk_size=4, delete=True).run()
+
+        manifest, archived = self.archived()
+        self.assertEqual(stats, {"chunks": 3, "items": 8, "deleted": 8, "complete": True})
+        self.assertEqual(sorted(archived), sorted(f"a{i}" for i in range(5)) + sorted(f"b{i}" for i in range(3)))
+        self.assertEqual(sorted(repository.deleted), sorted(archived))
+        self.assertEqual([chunk["items"] for chunk in manifest["chunks"] if chunk["segment"] == 0], [4, 1])
+
+    def test_resumes_from_checkpoint_without_duplicates(self):
+        repository = FakeRepository({0: shipments("a", 8)}, fail_after=6)
+        with self.assertRaises(ConnectionError):
+            ShippingArchiver(repository, self.output, segments=1, chunk_size=4).run()
+
+        stats = ShippingArchiver(repository, self.output, segments=1, chunk_size=4).run()
+
+        _, archived = self.archived()
+        self.assertEqual(stats["items"], 8)
+        self.assertEqual(archived, [f"a{i}" for i in range(8)])
+
+    def test_resume_finishes_interrupted_deletes(self):
+        repository = FakeRepository({0: shipments("a", 4)}, fail_deletes=2)
+        with self.assertRaises(ConnectionError):
+            ShippingArchiver(repository, self.output, segments=1, chunk_size=2, delete=True).run()
+        interrupted = ShippingArchiver(repository, self.output, segments=1, chunk_size=2, delete=True)
+        self.assertFalse(interrupted.stats()["complete"])
+
+        stats = interrupted.run()
+
+        self.assertEqual(stats, {"chunks": 2, "items": 4, "deleted": 4, "complete": True})
+        self.assertEqual(repository.deleted, [f"a{i}" for i in range(4)])
+
+    def test_refuses_manifest_from_different_layout(self):
+        ShippingArchiver(FakeRepository({0: []}), self.output, segments=1).run()
+        with self.assertRaises(ValueError):
+            ShippingArchiver(MagicMock(), self.output, segments=2)
+
+
+class TestScanShippings(unittest.TestCase):
+    def test_pages_through_segment_with_status_filter(self):
+        repository = ShippingRepository()
+        repository._table = MagicMock()
+        repository._table.scan.side_effect = [
+            {"Items": [{"shipping_id": "s1"}], "LastEvaluatedKey": {"shipping_id": "s1"}},
+            {"Items": [{"shipping_id": "s2"}]},
+        ]
+
+        pages = list(repository.scan_shippings(1, 4, ["completed", "failed"]))
+
+        self.assertEqual([key for _, key in pages], [{"shipping_id": "s1"}, None])
+        last = repository._table.scan.call_args.kwargs
+        self.assertEqual((last["Segment"], last["TotalSegments"]), (1, 4))
+        self.assertEqual(last["ExclusiveStartKey"], {"shipping_id": "s1"})
+        self.assertEqual(last["FilterExpression"], "shipping_status IN (:status0, :status1)")
+
+
+if __name__ == "__main__":
+    unittest.main()
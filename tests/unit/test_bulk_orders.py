@@ -0,0 +1,117 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from app.eshop import Product, ShoppingCart, place_orders
+from services import ShippingService
+from services.config import SHIPPING_TABLE_NAME
+from services.repository import ShippingRepository
+
+
+class ConditionalCheckFailed(Exception):
+    response = {"Error": {"Code": "ConditionalCheckFailedException"}}
+
+
+class TestBulkOrders(unittest.TestCase):
+    def setUp(self):
+        self.repository = ShippingRepository()
+        self.repository._resource = MagicMock()
+        self.repository._resource.batch_get_item.return_value = {}
+        self.repository._resource.batch_write_item.return_value = {}
+        self.publisher = MagicMock()
+        self.publisher.send_new_shippings.return_value = []
+        self.service = ShippingService(self.repository, self.publisher)
+        self.due_date = datetime.now(timezone.utc) + timedelta(minutes=1)
+
+    def cart(self, product):
+        cart = ShoppingCart()
+        cart.add_product(product, 1)
+        return cart
+
+    def written(self):
+        return [
+            request["PutRequest"]["Item"]
+            for call in self.repository._resource.batch_write_item.call_args_list
+            for request in call.kwargs["RequestItems"][SHIPPING_TABLE_NAME]
+        ]
+
+    def started(self):
+        return [call.kwargs["Key"]["shipping_id"] for call in self.repository.table.update_item.call_args_list]
+
+    def test_places_orders_in_chunks_with_batched_io(self):
+        product = Product(name="Product", price=10.0, available_amount=10)
+        orders = ((self.cart(product), "Нова Пошта", self.due_date) for _ in range(5))
+
+        results = list(place_orders(orders, self.service, chunk_size=2))
+
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result.ok and result.order.shipping_id == result.shipping_id for result in results))
+        self.assertEqual(product.available_amount, 5)
+        self.assertEqual(self.repository._resource.batch_get_item.call_count, 3)
+        self.assertEqual(self.publisher.send_new_shippings.call_count, 3)
+        self.publisher.send_new_shipping.assert_not_called()
+        statuses = [item["shipping_status"] for item in self.written()]
+        self.assertEqual(statuses, ["created"] * 5)
+        self.assertEqual(sorted(self.started()), sorted(result.shipping_id for result in results))
+        update = self.repository.table.update_item.call_args.kwargs
+        self.assertEqual(update["ConditionExpression"], "shipping_status = :expected")
+        self.assertEqual(update["ExpressionAttributeValues"][":expected"], "created")
+
+    def test_invalid_orders_fail_without_submitting_cart(self):
+        product = Product(name="Product", price=10.0, available_amount=10)
+        orders = [
+            (self.cart(product), "Новий тип доставки", self.due_date),
+            (self.cart(product), "Нова Пошта", datetime.now(timezone.utc) - timedelta(minutes=1)),
+        ]
+
+        results = list(place_orders(orders, self.service))
+
+        self.assertTrue(all(isinstance(result.error, ValueError) for result in results))
+        self.assertEqual(product.available_amount, 10)
+        self.publisher.send_new_shippings.assert_not_called()
+
+    def test_unpublished_shipping_is_reported_and_left_created(self):
+        product = Product(name="Product", price=10.0, available_amount=10)
+        self.publisher.send_new_shippings.side_effect = lambda ids, queue_name: ids[:1]
+
+        results = list(place_orders([(self.cart(product), "Нова Пошта", self.due_date)] * 2, self.service))
+
+        self.assertIsInstance(results[0].error, RuntimeError)
+        self.assertTrue(results[1].ok)
+        self.assertEqual(self.started(), [results[1].shipping_id])
+
+    def test_shipping_finished_by_consumer_is_not_overwritten(self):
+        self.repository.table.update_item.side_effect = ConditionalCheckFailed()
+
+        results = self.service.create_shippings([("Нова Пошта", ["Product"], "order-1", self.due_date)])
+
+        self.assertEqual(results, [ShippingRepository.shipping_id_for("order-1")])
+        self.assertEqual([item["shipping_status"] for item in self.written()], ["created"])
+
+    def test_existing_shipping_is_not_rewritten(self):
+        shipping_id = ShippingRepository.shipping_id_for("order-1")
+        self.repository._resource.batch_get_item.return_value = {
+            "Responses": {SHIPPING_TABLE_NAME: [{"shipping_id": shipping_id, "shipping_status": "completed"}]}
+        }
+
+        results = self.service.create_shippings([("Нова Пошта", ["Product"], "order-1", self.due_date)])
+
+        self.assertEqual(results, [shipping_id])
+        self.assertEqual(self.written(), [])
+        self.assertEqual(self.started(), [])
+        self.publisher.send_new_shippings.assert_not_called()
+
+    @patch("services.repository.time.sleep")
+    def test_unprocessed_keys_are_retried(self, _sleep):
+        keys = {SHIPPING_TABLE_NAME: {"Keys": [{"shipping_id": "s2"}]}}
+        self.repository._resource.batch_get_item.side_effect = [
+            {"Responses": {SHIPPING_TABLE_NAME: [{"shipping_id": "s1"}]}, "UnprocessedKeys": keys},
+            {"Responses": {SHIPPING_TABLE_NAME: [{"shipping_id": "s2"}]}},
+        ]
+
+        self.assertEqual(set(self.repository.get_shippings(["s1", "s2"])), {"s1", "s2"})
+        self.assertEqual(self.repository._resource.batch_get_item.call_args.kwargs["RequestItems"], keys)
+
+
+if __name__ == "__main__":
+    unittest.main()
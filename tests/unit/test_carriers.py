@@ -0,0 +1,87 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from services import ShippingService
+from services.carriers import build_registry
+from services.config import SHIPPING_QUEUE
+from services.consumer import AdaptiveConsumer
+from services.publisher import ShippingMessage, ShippingPublisher
+
+
+class TestCarrierRegistry(unittest.TestCase):
+    def test_lists_carriers_in_order(self):
+        self.assertEqual(
+            ShippingService.list_available_shipping_type(),
+            ['Нова Пошта', 'Укр Пошта', 'Meest Express', 'Самовивіз'],
+        )
+
+    def test_unsharded_carriers_share_default_queue(self):
+        registry = build_registry(sharded=False)
+        self.assertTrue(all(carrier.queue_name is None for carrier in registry))
+
+    def test_sharded_carriers_get_own_queue(self):
+        registry = build_registry(sharded=True)
+        self.assertEqual(registry['Самовивіз'].queue_name, f"{SHIPPING_QUEUE}-pickup")
+        self.assertNotIn('Новий тип доставки', registry)
+
+
+class TestCarrierRouting(unittest.TestCase):
+    def setUp(self):
+        self.repository = MagicMock()
+        self.repository.create_shipping.return_value = "shipping-1"
+        self.publisher = MagicMock()
+        self.due_date = datetime.now(timezone.utc) + timedelta(minutes=1)
+
+    def test_routes_shipment_to_carrier_queue(self):
+        service = ShippingService(self.repository, self.publisher, carriers=build_registry(sharded=True))
+        service.create_shipping('Укр Пошта', [], "order-1", self.due_date)
+        self.publisher.send_new_shipping.assert_called_once_with(
+            "shipping-1", queue_name=f"{SHIPPING_QUEUE}-ukr-poshta"
+        )
+
+    def test_unsharded_shipment_goes_to_default_queue(self):
+        service = ShippingService(self.repository, self.publisher, carriers=build_registry(sharded=False))
+        service.create_shipping('Укр Пошта', [], "order-1", self.due_date)
+        self.publisher.send_new_shipping.assert_called_once_with("shipping-1")
+
+
+class TestCarrierLanes(unittest.TestCase):
+    def setUp(self):
+        self.service = MagicMock()
+        self.service.carriers = build_registry(sharded=True)
+        self.service.process_messages.side_effect = lambda messages: messages
+        self.publisher = MagicMock()
+        self.publisher.queue_url_for.side_effect = lambda name: f"url/{name}"
+        self.publisher.approximate_depth.return_value = 100
+        self.publisher.receive_shipping.side_effect = lambda batch, wait, queue_url=None: [queue_url]
+
+    def test_subscribes_only_to_chosen_carriers_within_concurrency(self):
+        consumer = AdaptiveConsumer(
+            self.service, self.publisher, max_receivers=3, carriers=['Нова Пошта', 'Самовивіз']
+        )
+        self.assertEqual(consumer.lanes(), {f"{SHIPPING_QUEUE}-nova-poshta": 3, f"{SHIPPING_QUEUE}-pickup": 1})
+
+        results = consumer.run(max_rounds=1)
+
+        self.assertEqual(results.count(f"url/{SHIPPING_QUEUE}-nova-poshta"), 3)
+        self.assertEqual(results.count(f"url/{SHIPPING_QUEUE}-pickup"), 1)
+
+
+class TestRedriveRouting(unittest.TestCase):
+    def test_dead_letters_return_to_their_source_queue(self):
+        publisher = ShippingPublisher()
+        publisher._client = MagicMock()
+        publisher._client.send_message_batch.return_value = {}
+        publisher._queue_urls[SHIPPING_QUEUE] = "default-url"
+        message = ShippingMessage("s1", "h1", "dlq-url", source_queue_url="carrier-url")
+
+        self.assertEqual(publisher.redrive([message]), [message])
+        publisher._client.send_message_batch.assert_called_once()
+        self.assertEqual(publisher._client.send_message_batch.call_args.kwargs["QueueUrl"], "carrier-url")
+        publisher._client.delete_message_batch.assert_called_once()
+        self.assertEqual(publisher._client.delete_message_batch.call_args.kwargs["QueueUrl"], "dlq-url")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from services.consumer import AdaptiveConsumer, ConsumerPlan
+
+
+class TestAdaptiveConsumer(unittest.TestCase):
+    def setUp(self):
+        self.service = MagicMock()
+        self.service.process_messages.side_effect = lambda ids: [f"done {i}" for i in ids]
+        self.publisher = MagicMock()
+        self.consumer = AdaptiveConsumer(
+            self.service, self.publisher, max_batch=10, min_wait=0, max_wait=20, max_receivers=4
+        )
+
+    def test_empty_queue_uses_single_long_poll(self):
+        self.assertEqual(self.consumer.plan(0), ConsumerPlan(10, 20, 1))
+
+    def test_partial_batch_waits_briefly(self):
+        self.assertEqual(self.consumer.plan(5), ConsumerPlan(5, 10, 1))
+
+    def test_backlog_scales_receivers_up_to_bound(self):
+        self.assertEqual(self.consumer.plan(25), ConsumerPlan(10, 0, 3))
+        self.assertEqual(self.consumer.plan(10000), ConsumerPlan(10, 0, 4))
+
+    def test_rejects_bounds_outside_sqs_limits(self):
+        with self.assertRaises(ValueError):
+            AdaptiveConsumer(self.service, self.publisher, max_batch=11)
+        with self.assertRaises(ValueError):
+            AdaptiveConsumer(self.service, self.publisher, max_wait=21)
+
+    def test_prefetches_next_round_before_processing(self):
+        polls = []
+        prefetched = threading.Event()
+        self.publisher.approximate_depth.return_value = 3
+
+        def poll(*_):
+            polls.append(1)
+            if len(polls) == 2:
+                prefetched.set()
+            return ["a", "b", "c"]
+
+        def process(ids):
+            self.assertTrue(prefetched.wait(5), "Next round must be received while processing")
+            return ids
+
+        self.publisher.receive_shipping.side_effect = poll
+        self.service.process_messages.side_effect = process
+
+        results = self.consumer.run(max_rounds=2)
+
+        self.assertEqual(results, ["a", "b", "c"] * 2)
+        self.assertEqual(len(polls), 2)
+        self.publisher.receive_shipping.assert_called_with(3, 14)
+
+    def test_concurrent_receivers_are_merged(self):
+        self.publisher.approximate_depth.return_value = 40
+        self.publisher.receive_shipping.return_value = ["x"]
+
+        self.consumer.run(max_rounds=1)
+
+        self.assertEqual(self.publisher.receive_shipping.call_count, 4)
+        self.service.process_messages.assert_called_once_with(["x"] * 4)
+        self.assertEqual(self.consumer.received, 4)
+
+    def test_flushes_scheduler_when_stopping(self):
+        self.publisher.approximate_depth.return_value = 1
+        self.publisher.receive_shipping.return_value = ["x"]
+        self.service.flush_scheduled.return_value = ["done held"]
+
+        self.assertEqual(self.consumer.run(max_rounds=1), ["done x", "done held"])
+        self.service.flush_scheduled.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import MagicMock
+
+from services import ShippingService
+from services.heartbeat import VisibilityHeartbeat
+from services.publisher import ShippingMessage
+from services.redrive import redrive
+from services.resilience import CircuitOpenError
+
+
+def message(shipping_id, receive_count=1):
+    return ShippingMessage(shipping_id, f"handle-{shipping_id}", "queue-url", receive_count)
+
+
+class TestDeadLetterRouting(unittest.TestCase):
+    def setUp(self):
+        self.repository = MagicMock()
+        self.repository.get_shipping.side_effect = lambda shipping_id: None if shipping_id == "missing" else {
+            "due_date": "2999-01-01T00:00:00+00:00"
+        }
+        self.repository.update_shipping_status.return_value = {"ResponseMetadata": {"HTTPStatusCode": 200}}
+        self.publisher = MagicMock()
+        self.publisher.send_to_dead_letter.side_effect = lambda messages: messages
+        self.service = ShippingService(self.repository, self.publisher, max_receives=3)
+
+    def test_missing_shipping_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            self.service.process_shipping("missing")
+
+    def test_processed_messages_are_acknowledged(self):
+        ok = message("ok")
+        result = self.service.process_messages([ok, message("missing")])
+        self.assertEqual(result, [{"HTTPStatusCode": 200}])
+        self.publisher.acknowledge.assert_called_once_with([ok])
+        self.publisher.send_to_dead_letter.assert_not_called()
+
+    def test_poison_message_is_dead_lettered_after_max_receives(self):
+        poison = message("missing", receive_count=3)
+        self.service.process_messages([poison])
+        self.publisher.send_to_dead_letter.assert_called_once_with([poison])
+        self.publisher.acknowledge.assert_not_called()
+        self.assertEqual(self.service.dead_lettered, 1)
+
+    def test_infrastructure_errors_are_not_dead_lettered(self):
+        throttled = type("ThrottledError", (Exception,), {"response": {"Error": {"Code": "ThrottlingException"}}})
+        for error in (CircuitOpenError("open"), throttled()):
+            self.repository.get_shipping.side_effect = error
+            self.service.process_messages([message("s1", receive_count=3)])
+        self.publisher.send_to_dead_letter.assert_not_called()
+        self.publisher.acknowledge.assert_not_called()
+        self.assertEqual(self.publisher.retry.call_count, 2)
+
+
+class TestVisibilityHeartbeat(unittest.TestCase):
+    def test_beat_extends_only_tracked_messages(self):
+        publisher = MagicMock()
+        heartbeat = VisibilityHeartbeat(publisher, timeout=30, interval=3600)
+        first, second = message("a"), message("b")
+        with heartbeat.tracking([first, second]):
+            heartbeat.release([first])
+            heartbeat.beat()
+        heartbeat.beat()
+        heartbeat.stop()
+        publisher.extend_visibility.assert_called_once_with([second], 30)
+
+
+class TestRedrive(unittest.TestCase):
+    def test_redrives_in_batches_up_to_limit(self):
+        publisher = MagicMock()
+        publisher.receive_dead_letters.side_effect = lambda size: [message(str(i)) for i in range(size)]
+        publisher.redrive.side_effect = lambda messages: messages
+        self.assertEqual(redrive(publisher, batch_size=10, limit=25), 25)
+        self.assertEqual([c.args[0] for c in publisher.receive_dead_letters.call_args_list], [10, 10, 5])
+
+    def test_stops_when_dead_letter_queue_is_empty(self):
+        publisher = MagicMock()
+        publisher.receive_dead_letters.side_effect = [[message("a")], []]
+        publisher.redrive.side_effect = lambda messages: messages
+        self.assertEqual(redrive(publisher), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import uuid
+from unittest.mock import MagicMock
+
+from services import ShippingService
+from services.dedup import BloomFilter, RotatingBloomFilter, ShippingDeduplicator
+from services.publisher import ShippingMessage
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 1e-6)
+        keys = [str(uuid.uuid4()) for _ in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+
+    def test_false_positive_rate_within_bound(self):
+        bloom = BloomFilter(1000, 1e-3)
+        for _ in range(1000):
+            bloom.add(str(uuid.uuid4()))
+        false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(10000))
+        self.assertLess(false_positives, 50)
+
+
+class TestRotatingBloomFilter(unittest.TestCase):
+    def test_forgets_keys_after_two_windows(self):
+        clock = FakeClock()
+        bloom = RotatingBloomFilter(window=60, capacity=100, error_rate=1e-6, clock=clock)
+        bloom.add("a")
+        clock.now = 61
+        self.assertIn("a", bloom)
+        clock.now = 122
+        self.assertNotIn("a", bloom)
+
+    def test_rotates_when_full(self):
+        bloom = RotatingBloomFilter(window=3600, capacity=2, error_rate=1e-6, clock=FakeClock())
+        for key in ("a", "b", "c", "d", "e"):
+            bloom.add(key)
+        self.assertNotIn("a", bloom)
+        self.assertIn("e", bloom)
+
+
+class TestConsumerDedup(unittest.TestCase):
+    def setUp(self):
+        self.repository = MagicMock()
+        self.repository.get_shipping.return_value = {"due_date": "2999-01-01T00:00:00+00:00"}
+        self.publisher = MagicMock()
+        self.shared = set()
+        self.dedup = ShippingDeduplicator(shared=self.shared)
+        self.service = ShippingService(self.repository, self.publisher, dedup=self.dedup)
+
+    def test_redelivered_id_is_acknowledged_without_dynamodb_work(self):
+        first = ShippingMessage("s1", "h1", "queue-url")
+        again = ShippingMessage("s1", "h2", "queue-url", receive_count=2)
+        self.service.process_messages([first])
+        self.repository.reset_mock()
+
+        self.assertEqual(self.service.process_messages([again]), [])
+        self.repository.get_shipping.assert_not_called()
+        self.repository.update_shipping_status.assert_not_called()
+        self.publisher.acknowledge.assert_called_with([again])
+        self.assertEqual(self.dedup.suppressed, 1)
+
+    def test_shared_store_suppresses_ids_from_other_workers(self):
+        self.shared.add("s2")
+        self.service.process_messages([ShippingMessage("s2", "h1", "queue-url")])
+        self.repository.get_shipping.assert_not_called()
+
+    def test_failed_ids_are_not_marked(self):
+        self.repository.get_shipping.return_value = None
+        message = ShippingMessage("s3", "h1", "queue-url")
+        self.service.process_messages([message])
+        self.assertNotIn("s3", self.dedup.local)
+        self.assertEqual(self.dedup.suppressed, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from app.eshop import Order, Product, ShoppingCart
+from services import ShippingService
+from services.idempotency import IdempotencyCache
+from services.repository import ShippingAlreadyExists, ShippingRepository
+
+
+class ConditionalCheckFailed(Exception):
+    response = {"Error": {"Code": "ConditionalCheckFailedException"}}
+
+
+class TestIdempotentOrders(unittest.TestCase):
+    def setUp(self):
+        self.repository = MagicMock()
+        self.repository.create_shipping.return_value = "shipping-1"
+        self.publisher = MagicMock()
+        self.service = ShippingService(self.repository, self.publisher)
+        self.due_date = datetime.now(timezone.utc) + timedelta(minutes=1)
+
+    def order(self, order_id=None):
+        cart = ShoppingCart()
+        cart.add_product(Product(name="Product", price=10.0, available_amount=5), 1)
+        if order_id is None:
+            return Order(cart, self.service)
+        return Order(cart, self.service, order_id)
+
+    def test_each_order_gets_its_own_id(self):
+        self.assertNotEqual(self.order().order_id, self.order().order_id)
+
+    def test_retried_place_order_returns_original_shipping(self):
+        order = self.order()
+        first = order.place_order("Нова Пошта", self.due_date)
+        second = order.place_order("Нова Пошта", self.due_date)
+        self.assertEqual(first, second)
+        self.repository.create_shipping.assert_called_once()
+        self.publisher.send_new_shipping.assert_called_once_with("shipping-1")
+
+    def test_same_order_id_skips_backend(self):
+        self.order("order-1").place_order("Нова Пошта", self.due_date)
+        self.assertEqual(self.order("order-1").place_order("Нова Пошта", self.due_date), "shipping-1")
+        self.repository.create_shipping.assert_called_once()
+        self.assertEqual(self.service.idempotency.hits, 1)
+
+    def test_existing_published_shipping_is_not_sent_again(self):
+        self.repository.create_shipping.side_effect = ShippingAlreadyExists("shipping-1")
+        self.repository.get_shipping.return_value = {"shipping_status": ShippingService.SHIPPING_IN_PROGRESS}
+        self.assertEqual(self.service.create_shipping("Нова Пошта", [], "order-1", self.due_date), "shipping-1")
+        self.publisher.send_new_shipping.assert_not_called()
+
+    def test_existing_unpublished_shipping_is_finished(self):
+        self.repository.create_shipping.side_effect = ShippingAlreadyExists("shipping-1")
+        self.repository.get_shipping.return_value = {"shipping_status": ShippingService.SHIPPING_CREATED}
+        self.service.create_shipping("Нова Пошта", [], "order-1", self.due_date)
+        self.publisher.send_new_shipping.assert_called_once_with("shipping-1")
+        self.repository.update_shipping_status.assert_called_once_with(
+            "shipping-1", ShippingService.SHIPPING_IN_PROGRESS
+        )
+
+
+class TestRepositoryGuard(unittest.TestCase):
+    def test_conditional_put_failure_raises_already_exists(self):
+        repository = ShippingRepository()
+        repository._table = MagicMock()
+        repository._table.put_item.side_effect = ConditionalCheckFailed()
+        due_date = datetime.now(timezone.utc)
+        with self.assertRaises(ShippingAlreadyExists) as error:
+            repository.create_shipping("Нова Пошта", [], "order-1", "created", due_date)
+        self.assertEqual(
+            repository._table.put_item.call_args.kwargs["ConditionExpression"],
+            "attribute_not_exists(shipping_id)",
+        )
+        self.assertEqual(
+            error.exception.shipping_id,
+            repository._table.put_item.call_args.kwargs["Item"]["shipping_id"],
+        )
+
+
+class TestIdempotencyCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = IdempotencyCache(maxsize=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(len(cache), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# Wall-clock budgets are noisy on shared runners, so the timing check only runs
+# when IMPORT_BUDGET_US is set; the sys.modules check always runs.
+IMPORT_BUDGET_US = int(os.getenv("IMPORT_BUDGET_US", "0"))
+LAZY_MODULES = ("boto3", "botocore", "cProfile", "tracemalloc")
+
+
+def import_profile(module):
+    check = f"import sys, {module}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    match = re.search(rf"^import time:\s+\d+ \|\s+(\d+) \| {re.escape(module)}$", result.stderr, re.MULTILINE)
+    return (int(match.group(1)) if match else None), result.stdout.strip()
+
+
+class TestImportTime(unittest.TestCase):
+    def test_eshop_import_does_not_load_aws_sdk(self):
+        _, loaded = import_profile("app.eshop")
+        self.assertEqual(loaded, "", "Heavy modules must be imported lazily")
+
+    @unittest.skipUnless(IMPORT_BUDGET_US, "set IMPORT_BUDGET_US to check the import time budget")
+    def test_eshop_import_within_budget(self):
+        cumulative_us, _ = import_profile("app.eshop")
+        self.assertIsNotNone(cumulative_us, "app.eshop not found in -X importtime output")
+        self.assertLess(cumulative_us, IMPORT_BUDGET_US, "app.eshop import exceeded its time budget")
+
+
+if __name__ == '__main__':
+    unittest.main()
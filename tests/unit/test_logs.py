@@ -0,0 +1,78 @@
+import io
+import json
+import logging
+import queue
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.eshop import Order, Product, ShoppingCart
+from services.logs import DroppingQueueHandler, SamplingFilter, configure_logging, parse_levels, stop_logging
+
+
+class TestLoggingPipeline(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.addCleanup(stop_logging)
+        self.root_level = logging.getLogger().level
+        self.addCleanup(logging.getLogger().setLevel, self.root_level)
+        for name in ("tests.noisy", "app.eshop"):
+            self.addCleanup(logging.getLogger(name).setLevel, logging.NOTSET)
+
+    def lines(self):
+        stop_logging()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_writes_structured_records_from_background_thread(self):
+        configure_logging(level="INFO", levels="tests.noisy=ERROR", stream=self.stream)
+        logging.getLogger("tests.quiet").info("Shipping %s done", "s1", extra={"shipping_id": "s1"})
+        logging.getLogger("tests.noisy").warning("suppressed by per-module level")
+
+        (line,) = self.lines()
+        self.assertEqual(line["message"], "Shipping s1 done")
+        self.assertEqual(line["shipping_id"], "s1")
+        self.assertEqual(line["logger"], "tests.quiet")
+
+    def place_order(self, sample_rate):
+        configure_logging(level="INFO", levels={"app.eshop": "DEBUG"}, stream=self.stream)
+        service = MagicMock()
+        service.create_shipping.return_value = "shipping-1"
+        cart = ShoppingCart()
+        cart.add_product(Product(name="Product", price=10.0, available_amount=5), 1)
+        with patch("app.eshop.SHIPPING_LOG_SAMPLE_RATE", sample_rate):
+            Order(cart, service, "order-1").place_order("Нова Пошта")
+
+    def test_order_placement_logs_instead_of_printing(self):
+        self.place_order(sample_rate=1.0)
+
+        (line,) = self.lines()
+        self.assertEqual((line["order_id"], line["shipping_type"]), ("order-1", "Нова Пошта"))
+        self.assertNotIn("sample_rate", line)
+
+    def test_order_placement_logs_are_sampled(self):
+        self.place_order(sample_rate=0.0)
+
+        self.assertEqual(self.lines(), [])
+
+    def test_sampling_filter_keeps_share_of_sampled_records(self):
+        sampler = SamplingFilter(random_source=iter([0.05, 0.5, 0.005]).__next__)
+        record = logging.makeLogRecord({"sample_rate": 0.01})
+        self.assertEqual([sampler.filter(record) for _ in range(3)], [False, False, True])
+        self.assertTrue(sampler.filter(logging.makeLogRecord({})))
+        self.assertEqual(sampler.dropped, 2)
+
+    def test_full_queue_drops_without_blocking_or_formatting(self):
+        handler = DroppingQueueHandler(queue.Queue(1))
+        unformattable = MagicMock()
+        unformattable.__str__.side_effect = AssertionError("formatted in caller")
+        for _ in range(3):
+            handler.handle(logging.makeLogRecord({"msg": "%s", "args": (unformattable,)}))
+        self.assertEqual((handler.queue.qsize(), handler.dropped), (1, 2))
+
+    def test_parse_levels(self):
+        self.assertEqual(parse_levels(" services=debug, app.eshop=WARNING "), {"services": "DEBUG", "app.eshop": "WARNING"})
+        with self.assertRaises(ValueError):
+            parse_levels("services")
+
+
+if __name__ == "__main__":
+    unittest.main()
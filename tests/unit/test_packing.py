@@ -0,0 +1,121 @@
+import unittest
+import uuid
+from unittest.mock import MagicMock, patch
+
+from services import packing
+from services.config import SHIPPING_DLQ, SHIPPING_QUEUE
+from services.publisher import ShippingPublisher
+
+
+def make_publisher():
+    publisher = ShippingPublisher(pack_messages=True)
+    publisher._client = MagicMock()
+    publisher._client.send_message_batch.return_value = {}
+    publisher._queue_urls[SHIPPING_QUEUE] = "queue-url"
+    publisher._queue_urls[SHIPPING_DLQ] = "dlq-url"
+    return publisher
+
+
+class TestPacking(unittest.TestCase):
+    def test_round_trips_uuids_and_text_ids(self):
+        ids = [str(uuid.uuid4()) for _ in range(50)]
+        self.assertEqual(packing.decode(packing.encode(ids)), ids)
+        mixed = ids[:3] + ["order-7", "Нова Пошта"]
+        self.assertEqual(packing.decode(packing.encode(mixed)), mixed)
+
+    def test_pack_splits_bodies_within_size_limit(self):
+        ids = [str(uuid.uuid4()) for _ in range(2000)]
+        bodies = packing.pack(ids, max_bytes=4096)
+        self.assertGreater(len(bodies), 1)
+        self.assertTrue(all(len(body) <= 4096 for body in bodies))
+        self.assertEqual([i for body in bodies for i in packing.decode(body)], ids)
+
+    def test_rejects_unknown_version(self):
+        with self.assertRaises(ValueError):
+            packing.decode(packing.PACK_PREFIX + "AAA=")
+
+    def test_rejects_corrupt_bodies_with_value_error(self):
+        compressed = packing.encode([f"order-{index}" for index in range(200)])
+        for corrupt in (compressed[:-8], packing.PACK_PREFIX + "not base64!", packing.PACK_PREFIX + "AQA="):
+            with self.assertRaises(ValueError):
+                packing.decode(corrupt)
+
+
+class TestPackedPublisher(unittest.TestCase):
+    def setUp(self):
+        self.publisher = make_publisher()
+        self.ids = ["s1", "s2", "s3"]
+        self.publisher._client.receive_message.return_value = {"Messages": [{
+            "MessageId": "message",
+            "Body": packing.encode(self.ids),
+            "ReceiptHandle": "handle",
+            "Attributes": {"ApproximateReceiveCount": "1"},
+        }]}
+
+    def test_receive_unpacks_ids_sharing_receipt_handle(self):
+        messages = self.publisher.receive_shipping()
+        self.assertEqual([message.shipping_id for message in messages], self.ids)
+        self.assertEqual({message.receipt_handle for message in messages}, {"handle"})
+        self.assertEqual(self.publisher.poll_shipping(), self.ids)
+
+    def test_corrupt_message_is_dead_lettered_without_losing_the_batch(self):
+        corrupt = packing.PACK_PREFIX + "AQMD"
+        self.publisher._client.receive_message.return_value = {"Messages": [
+            {"Body": corrupt, "ReceiptHandle": "bad", "Attributes": {"ApproximateReceiveCount": "1"}},
+            {"Body": packing.encode(self.ids), "ReceiptHandle": "handle", "Attributes": {}},
+        ]}
+
+        messages = self.publisher.receive_shipping()
+
+        self.assertEqual([message.shipping_id for message in messages], self.ids)
+        client = self.publisher._client
+        send = client.send_message_batch.call_args.kwargs
+        self.assertEqual(send["QueueUrl"], "dlq-url")
+        self.assertEqual(send["Entries"][0]["MessageBody"], corrupt)
+        client.delete_message_batch.assert_called_once_with(
+            QueueUrl="queue-url", Entries=[{"Id": "0", "ReceiptHandle": "bad"}]
+        )
+
+    def test_partial_failure_resends_only_failed_id(self):
+        first, second, third = self.publisher.receive_shipping()
+        client = self.publisher._client
+
+        self.publisher.acknowledge([first, third])
+        client.delete_message_batch.assert_not_called()
+
+        self.assertEqual(self.publisher.retry([second]), [second])
+        entries = client.send_message_batch.call_args.kwargs["Entries"]
+        self.assertEqual(packing.decode(entries[0]["MessageBody"]), ["s2"])
+        self.assertEqual(entries[0]["MessageAttributes"]["receive_count"]["StringValue"], "1")
+        client.delete_message_batch.assert_called_once_with(
+            QueueUrl="queue-url", Entries=[{"Id": "0", "ReceiptHandle": "handle"}]
+        )
+
+    def test_single_id_packs_are_not_tracked(self):
+        self.publisher._client.receive_message.return_value = {"Messages": [
+            {"MessageId": "single", "Body": packing.encode(["s4"]), "ReceiptHandle": "h1", "Attributes": {}},
+        ]}
+        self.publisher.acknowledge(self.publisher.receive_shipping())
+        self.assertEqual(self.publisher._open_packs, {})
+        self.publisher._client.delete_message_batch.assert_called_once()
+
+    def test_redelivered_pack_replaces_its_stale_handle(self):
+        self.publisher.receive_shipping()
+        self.publisher._client.receive_message.return_value["Messages"][0]["ReceiptHandle"] = "redelivered"
+        self.publisher.acknowledge(self.publisher.receive_shipping())
+        self.assertEqual(self.publisher._open_packs, {})
+        self.assertEqual(self.publisher._pack_handles, {})
+
+    def test_open_packs_are_bounded(self):
+        with patch("services.publisher.OPEN_PACKS_LIMIT", 2):
+            for index in range(3):
+                self.publisher._client.receive_message.return_value["Messages"][0].update(
+                    MessageId=f"message-{index}", ReceiptHandle=f"handle-{index}"
+                )
+                self.publisher.receive_shipping()
+        self.assertEqual(list(self.publisher._open_packs), ["handle-1", "handle-2"])
+        self.assertEqual(set(self.publisher._pack_handles), {"message-1", "message-2"})
+
+
+if __name__ == "__main__":
+    unittest.main()
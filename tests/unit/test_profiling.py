@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from services import ShippingService
+from services.profiling import BatchProfiler
+
+
+class TestBatchProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def files(self):
+        return sorted(os.listdir(self.tmp.name))
+
+    def run_batches(self, profiler, count):
+        for _ in range(count):
+            with profiler.batch():
+                sum(range(1000))
+
+    def test_profiles_every_nth_batch(self):
+        profiler = BatchProfiler(self.tmp.name, every=2, overhead_budget=1.0)
+        self.run_batches(profiler, 4)
+        self.assertEqual(profiler.profiled, 2)
+        self.assertTrue(all(name.endswith(".prof") for name in self.files()))
+
+    def test_rotation_keeps_latest_files(self):
+        profiler = BatchProfiler(self.tmp.name, every=1, keep=2, overhead_budget=1.0)
+        self.run_batches(profiler, 5)
+        self.assertEqual(len(self.files()), 2)
+
+    def test_arm_triggers_next_batch_only(self):
+        profiler = BatchProfiler(self.tmp.name, mode="sample", overhead_budget=1.0)
+        self.run_batches(profiler, 2)
+        profiler.arm()
+        self.run_batches(profiler, 2)
+        self.assertEqual(profiler.profiled, 1)
+        self.assertTrue(self.files()[0].endswith(".folded"))
+
+    def test_overhead_budget_skips_batches(self):
+        profiler = BatchProfiler(self.tmp.name, every=1, overhead_budget=0.0)
+        self.run_batches(profiler, 3)
+        self.assertEqual(profiler.profiled, 1)
+        self.assertEqual(profiler.skipped, 2)
+
+    def test_tracemalloc_reports_allocation_sites(self):
+        profiler = BatchProfiler(self.tmp.name, mode="tracemalloc", every=1, overhead_budget=1.0)
+        with profiler.batch():
+            data = [str(i) for i in range(10000)]
+        self.assertTrue(data)
+        path = os.path.join(self.tmp.name, self.files()[0])
+        with open(path, encoding="utf-8") as report:
+            self.assertIn("test_profiling.py", report.read())
+
+    def test_from_config_requires_mode(self):
+        with patch("services.profiling.SHIPPING_PROFILE_MODE", ""):
+            self.assertIsNone(BatchProfiler.from_config())
+            self.assertIsNone(ShippingService(MagicMock(), MagicMock()).profiler)
+        with patch("services.profiling.SHIPPING_PROFILE_MODE", "sample"):
+            profiler = ShippingService(MagicMock(), MagicMock()).profiler
+        self.assertEqual(profiler.mode, "sample")
+
+    def test_service_profiles_shipping_batch(self):
+        publisher = MagicMock()
+        publisher.receive_shipping.return_value = []
+        profiler = BatchProfiler(self.tmp.name, every=1, overhead_budget=1.0)
+        service = ShippingService(MagicMock(), publisher, profiler=profiler)
+        self.assertEqual(service.process_shipping_batch(), [])
+        self.assertEqual(profiler.profiled, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+import random
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from services.reporting import QuantileSketch, ShippingReport
+from services.repository import ShippingRepository
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def shipment(shipping_type, status, latency=None, due_in=60):
+    item = {
+        "shipping_type": shipping_type,
+        "shipping_status": status,
+        "created_date": START.isoformat(),
+        "due_date": (START + timedelta(seconds=due_in)).isoformat(),
+    }
+    if latency is not None:
+        item["updated_date"] = (START + timedelta(seconds=latency)).isoformat()
+    return item
+
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_quantiles_within_relative_accuracy(self):
+        values = [random.uniform(0.01, 1000) for _ in range(20000)]
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+        values.sort()
+        for q in (0.5, 0.9, 0.99):
+            expected = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q) / expected, 1, delta=0.02)
+        self.assertLess(len(sketch._buckets), 1000)
+
+    def test_merge_matches_single_sketch(self):
+        first, second, combined = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for value in range(1, 101):
+            (first if value % 2 else second).add(value)
+            combined.add(value)
+        first.merge(second)
+        self.assertEqual(first.quantile(0.9), combined.quantile(0.9))
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+
+class TestShippingReport(unittest.TestCase):
+    def setUp(self):
+        self.report = ShippingReport(bucket_seconds=3600).consume([
+            shipment("Нова Пошта", "completed", latency=30),
+            shipment("Нова Пошта", "completed", latency=90),
+            shipment("Нова Пошта", "failed", latency=61),
+            shipment("Нова Пошта", "in progress"),
+            # Written before updated_date was recorded.
+            {"shipping_type": "Нова Пошта", "shipping_status": "completed"},
+        ])
+
+    def test_groups_by_type_and_status(self):
+        rows = {row["status"]: row for row in self.report.rows()}
+        completed = rows["completed"]
+        self.assertEqual((completed["count"], completed["finished"], completed["on_time"]), (3, 2, 1))
+        self.assertEqual(completed["on_time_rate"], 0.5)
+        self.assertEqual(completed["latency_mean"], 60)
+        self.assertEqual(rows["in progress"]["on_time_rate"], None)
+        self.assertEqual(rows["failed"]["on_time"], 0)
+
+    def test_histogram_and_outputs(self):
+        stream = io.StringIO()
+        self.report.write_json(stream)
+        histogram = json.loads(stream.getvalue())["histogram"]
+        self.assertEqual(histogram, [
+            {"bucket": START.isoformat(), "status": "completed", "count": 2},
+            {"bucket": START.isoformat(), "status": "failed", "count": 1},
+        ])
+
+        stream = io.StringIO()
+        self.report.write_csv(stream)
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(stream.getvalue())))), 3)
+
+    def test_status_update_records_updated_date(self):
+        repository = ShippingRepository()
+        repository._table = MagicMock()
+        repository.update_shipping_status("s1", "completed")
+        values = repository._table.update_item.call_args.kwargs["ExpressionAttributeValues"]
+        self.assertIsNotNone(datetime.fromisoformat(values[":updated"]).tzinfo)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import unittest
+from unittest.mock import MagicMock
+
+from services.config import SHIPPING_QUEUE, SHIPPING_TABLE_NAME
+from services.publisher import ShippingPublisher
+from services.repository import ShippingRepository
+from services.resilience import (
+    Backoff,
+    CircuitBreaker,
+    CircuitOpenError,
+    Resilience,
+    TokenBucket,
+    get_resilience,
+)
+
+
+class AwsError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestResilience(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def resilience(self, rate=0, attempts=3, threshold=5):
+        return Resilience(
+            "ShippingTable", rate,
+            backoff=Backoff(max_attempts=attempts),
+            breaker=CircuitBreaker(failure_threshold=threshold, clock=self.clock),
+            sleep=self.clock.sleep,
+        )
+
+    def test_retries_throttled_call(self):
+        operation = MagicMock(side_effect=[AwsError("ThrottlingException"), {"ok": True}])
+        policy = self.resilience()
+        self.assertEqual(policy.call(operation, Key="id"), {"ok": True})
+        operation.assert_called_with(Key="id")
+        self.assertEqual(policy.stats()["retries"], 1)
+        self.assertEqual(policy.stats()["throttles"], 1)
+
+    def test_does_not_retry_client_errors(self):
+        operation = MagicMock(side_effect=AwsError("ValidationException"))
+        policy = self.resilience()
+        with self.assertRaises(AwsError):
+            policy.call(operation)
+        self.assertEqual(operation.call_count, 1)
+        self.assertEqual(policy.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_gives_up_after_max_attempts(self):
+        operation = MagicMock(side_effect=AwsError("InternalServerError"))
+        with self.assertRaises(AwsError):
+            self.resilience(attempts=3).call(operation)
+        self.assertEqual(operation.call_count, 3)
+
+    def test_circuit_trips_and_fails_fast(self):
+        operation = MagicMock(side_effect=AwsError("ServiceUnavailable"))
+        policy = self.resilience(attempts=1, threshold=2)
+        for _ in range(2):
+            with self.assertRaises(AwsError):
+                policy.call(operation)
+        with self.assertRaises(CircuitOpenError):
+            policy.call(operation)
+        self.assertEqual(operation.call_count, 2)
+        self.assertEqual(policy.stats()["state"], CircuitBreaker.OPEN)
+        self.assertEqual(policy.stats()["trips"], 1)
+
+    def test_circuit_half_opens_after_timeout(self):
+        operation = MagicMock(side_effect=[AwsError("ServiceUnavailable"), "done"])
+        policy = self.resilience(attempts=1, threshold=1)
+        with self.assertRaises(AwsError):
+            policy.call(operation)
+        self.clock.now += policy.breaker.reset_timeout
+        self.assertEqual(policy.call(operation), "done")
+        self.assertEqual(policy.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_throttled_burst_leaves_circuit_closed(self):
+        policy = self.resilience(rate=100, attempts=5, threshold=2)
+        for _ in range(10):
+            operation = MagicMock(side_effect=[AwsError("ThrottlingException")] * 4 + ["done"])
+            self.assertEqual(policy.call(operation), "done")
+        self.assertEqual(policy.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(policy.stats()["trips"], 0)
+        self.assertLess(policy.bucket.rate, 100)
+
+    def test_exhausted_throttling_does_not_trip_circuit(self):
+        operation = MagicMock(side_effect=AwsError("ThrottlingException"))
+        policy = self.resilience(attempts=2, threshold=1)
+        for _ in range(3):
+            with self.assertRaises(AwsError):
+                policy.call(operation)
+        self.assertEqual(policy.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_transient_failure_counts_once_per_call(self):
+        operation = MagicMock(side_effect=[AwsError("InternalServerError")] * 2 + ["done"])
+        policy = self.resilience(attempts=3, threshold=2)
+        self.assertEqual(policy.call(operation), "done")
+        self.assertEqual(policy.breaker.failures, 0)
+
+    def test_half_open_allows_single_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=self.clock)
+        breaker.record_failure()
+        self.clock.now += 5
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(10, burst=1, clock=self.clock, sleep=self.clock.sleep)
+        for _ in range(11):
+            bucket.acquire()
+        self.assertAlmostEqual(self.clock.now, 1.0)
+
+    def test_token_bucket_sustains_many_acquires(self):
+        bucket = TokenBucket(10, burst=3, clock=self.clock, sleep=self.clock.sleep)
+        for _ in range(503):
+            bucket.acquire()
+        self.assertAlmostEqual(self.clock.now, 50.0)
+
+    def test_token_bucket_adapts_to_throttling(self):
+        bucket = TokenBucket(100, min_rate=10, clock=self.clock)
+        for _ in range(5):
+            bucket.on_throttle()
+        self.assertEqual(bucket.rate, 10)
+        bucket.on_success()
+        self.assertEqual(bucket.rate, 11)
+
+
+class TestSharedPolicy(unittest.TestCase):
+    def test_repository_calls_go_through_table_policy(self):
+        repository = ShippingRepository()
+        repository._table = MagicMock()
+        repository._table.get_item.side_effect = [AwsError("ThrottlingException"), {"Item": {"shipping_id": "s1"}}]
+        policy = get_resilience(SHIPPING_TABLE_NAME, 0)
+        throttles = policy.throttles
+
+        self.assertIs(repository.resilience, policy)
+        self.assertEqual(repository.get_shipping("s1"), {"shipping_id": "s1"})
+        self.assertEqual(policy.throttles, throttles + 1)
+
+    def test_publisher_calls_go_through_queue_policy(self):
+        publisher = ShippingPublisher()
+        publisher._client = MagicMock()
+        publisher._client.create_queue.return_value = {"QueueUrl": "queue-url"}
+        publisher._client.send_message.side_effect = [AwsError("ServiceUnavailable"), {"MessageId": "m1"}]
+        policy = get_resilience(SHIPPING_QUEUE, 0)
+        retries = policy.retries
+
+        self.assertIs(publisher.resilience, policy)
+        self.assertEqual(publisher.send_new_shipping("s1"), "m1")
+        self.assertEqual(policy.retries, retries + 1)
+
+    def test_each_queue_has_its_own_policy(self):
+        publisher = ShippingPublisher()
+        publisher._client = MagicMock()
+        publisher._client.create_queue.side_effect = lambda QueueName: {"QueueUrl": f"http://sqs/000/{QueueName}"}
+        publisher._client.send_message.return_value = {"MessageId": "m1"}
+        lane = get_resilience("ShippingQueue-ukr-poshta-test", 0)
+        calls = lane.calls
+
+        publisher.send_new_shipping("s1", queue_name="ShippingQueue-ukr-poshta-test")
+
+        self.assertEqual(lane.calls, calls + 2)
+        self.assertIs(publisher.policy_for("http://sqs/000/ShippingQueue-ukr-poshta-test"), lane)
+        # URLs never resolved in this process, e.g. from a DLQ attribute, map by name.
+        self.assertIs(publisher.policy_for("http://sqs/000/OtherQueue"), get_resilience("OtherQueue", 0))
+        self.assertIsNot(publisher.policy_for(publisher.dead_letter_queue_url), publisher.resilience)
+
+
+if __name__ == '__main__':
+    unittest.main()
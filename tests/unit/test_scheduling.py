@@ -0,0 +1,122 @@
+import sys
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from services import ShippingService
+from services.publisher import ShippingMessage
+from services.scheduling import DeadlineScheduler
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def scheduler(**kwargs):
+    return DeadlineScheduler(clock=lambda: NOW, urgent_window=timedelta(minutes=5), **kwargs)
+
+
+class TestDeadlineScheduler(unittest.TestCase):
+    def test_pops_earliest_deadline_first(self):
+        buffer = scheduler()
+        for minutes in (60, 10, 30):
+            buffer.push(NOW + timedelta(minutes=minutes), minutes)
+        self.assertEqual([buffer.pop().item for _ in range(3)], [10, 30, 60])
+
+    def test_weights_urgent_and_normal_lanes(self):
+        buffer = scheduler(urgent_weight=2, normal_weight=1)
+        for index in range(3):
+            buffer.push(NOW + timedelta(minutes=1 + index), f"urgent-{index}")
+            buffer.push(NOW + timedelta(hours=1 + index), f"normal-{index}")
+        order = [buffer.pop().item for _ in range(3)]
+        self.assertEqual(order, ["urgent-0", "normal-0", "urgent-1"])
+
+    def test_drain_keeps_buffer_within_capacity(self):
+        buffer = scheduler(capacity=3)
+        for minutes in range(5):
+            buffer.push(NOW + timedelta(hours=minutes), minutes)
+        self.assertEqual(len(buffer.drain(incoming=1)), 2)
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(len(buffer.drain(incoming=0)), 3)
+
+    def test_concurrent_drains_never_overdraw(self):
+        buffer = scheduler(capacity=150)
+        for minutes in range(200):
+            buffer.push(NOW + timedelta(hours=minutes), minutes)
+        drained = []
+        errors = []
+
+        def drain():
+            try:
+                while len(buffer):
+                    drained.extend(entry.item for entry in buffer.drain(incoming=1))
+            except Exception as error:
+                errors.append(error)
+
+        # Switch threads as often as possible so the drains interleave.
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=drain) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(drained), list(range(200)))
+
+    def test_drain_releases_everything_once_an_entry_is_too_old(self):
+        now = [NOW]
+        buffer = DeadlineScheduler(capacity=10, max_age=timedelta(seconds=60), clock=lambda: now[0])
+        for minutes in range(3):
+            buffer.push(NOW + timedelta(hours=minutes), minutes)
+        self.assertEqual(len(buffer.drain(incoming=1)), 1)
+        now[0] += timedelta(seconds=61)
+        self.assertEqual(len(buffer.drain(incoming=1)), 2)
+
+    def test_records_missed_and_saved_deadlines(self):
+        buffer = scheduler()
+        buffer.push(NOW - timedelta(minutes=1), "late")
+        buffer.push(NOW + timedelta(minutes=1), "urgent")
+        buffer.push(NOW + timedelta(days=1), "relaxed")
+        for _ in range(3):
+            buffer.record(buffer.pop())
+        self.assertEqual(buffer.stats(), {"buffered": 0, "missed": 1, "saved": 1, "on_time": 1})
+
+
+class TestScheduledConsumer(unittest.TestCase):
+    def test_service_processes_urgent_shipments_first(self):
+        due_dates = {
+            "relaxed": datetime.now(timezone.utc) + timedelta(days=2),
+            "urgent": datetime.now(timezone.utc) + timedelta(minutes=1),
+        }
+        repository = MagicMock()
+        repository.get_shipping.side_effect = lambda shipping_id: {"due_date": due_dates[shipping_id].isoformat()}
+        repository.update_shipping_status.side_effect = lambda shipping_id, status: {"ResponseMetadata": shipping_id}
+        buffer = DeadlineScheduler(capacity=10, urgent_window=timedelta(minutes=5))
+        service = ShippingService(repository, MagicMock(), scheduler=buffer)
+
+        messages = [ShippingMessage(shipping_id, shipping_id, "queue-url") for shipping_id in ("relaxed", "urgent")]
+        self.assertEqual(service.process_messages(messages), ["urgent", "relaxed"])
+        self.assertEqual(repository.get_shipping.call_count, 2)
+        self.assertEqual(buffer.stats()["saved"], 1)
+
+    def test_flush_processes_buffered_shipments(self):
+        repository = MagicMock()
+        repository.get_shipping.return_value = {"due_date": (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()}
+        repository.update_shipping_status.side_effect = lambda shipping_id, status: {"ResponseMetadata": shipping_id}
+        buffer = DeadlineScheduler(capacity=10)
+        buffer.push(datetime.now(timezone.utc) + timedelta(days=1), (ShippingMessage("held", "held", "queue-url"), None))
+        publisher = MagicMock()
+        service = ShippingService(repository, publisher, scheduler=buffer)
+
+        self.assertEqual(service.flush_scheduled(), ["held"])
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(service.flush_scheduled(), [])
+        publisher.acknowledge.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.eshop import Product, ShoppingCart
+from app.snapshot import (
+    FLAG_ZLIB,
+    DynamoCartStore,
+    SqliteCartStore,
+    load_carts,
+    restore_cart,
+    save_carts,
+    snapshot_cart,
+)
+
+
+def catalog_and_cart(lines=3):
+    catalog = {}
+    cart = ShoppingCart()
+    for index in range(lines):
+        product = Product(name=f"Товар {index}", price=10.0, available_amount=500)
+        catalog[product.name] = product
+        cart.add_product(product, 1 + index * 100 % 400)
+    return catalog, cart
+
+
+class TestCartSnapshot(unittest.TestCase):
+    def test_round_trip_with_and_without_compression(self):
+        catalog, cart = catalog_and_cart(lines=50)
+        for compress in (True, False):
+            restored = restore_cart(snapshot_cart(cart, compress=compress), catalog)
+            self.assertEqual({p.name: n for p, n in restored.products.items()},
+                             {p.name: n for p, n in cart.products.items()})
+        self.assertLess(len(snapshot_cart(cart)), len(snapshot_cart(cart, compress=False)))
+
+    def test_rejects_bad_snapshots(self):
+        catalog, cart = catalog_and_cart()
+        data = snapshot_cart(cart)
+        for bad in (b"", b"XX\x01\x00", data[:2] + b"\x09" + data[3:], data + b"\x00", data[:-1]):
+            with self.assertRaises(ValueError):
+                restore_cart(bad, catalog)
+        with self.assertRaises(ValueError):
+            restore_cart(data, {})
+
+        compressed = snapshot_cart(catalog_and_cart(lines=50)[1])
+        self.assertTrue(compressed[3] & FLAG_ZLIB)
+        for bad in (compressed[:-4], compressed[:4] + b"\x00" + compressed[5:]):
+            with self.assertRaises(ValueError):
+                restore_cart(bad, catalog)
+
+
+class TestCartStores(unittest.TestCase):
+    def test_sqlite_store_batches_reads_and_writes(self):
+        catalog, cart = catalog_and_cart()
+        store = SqliteCartStore(":memory:")
+        self.addCleanup(store.close)
+        save_carts(store, {f"session-{index}": cart for index in range(1200)})
+
+        carts = load_carts(store, ["session-0", "session-1199", "missing"], catalog)
+
+        self.assertEqual(set(carts), {"session-0", "session-1199"})
+        store.delete_many(["session-0"])
+        self.assertEqual(len(store.load_many(f"session-{index}" for index in range(1200))), 1199)
+
+    def test_dynamo_store_chunks_batches(self):
+        catalog, cart = catalog_and_cart()
+        data = snapshot_cart(cart)
+        store = DynamoCartStore("carts")
+        store._resource = MagicMock()
+        store._resource.batch_write_item.return_value = {}
+        binary = MagicMock(value=data)
+        store._resource.batch_get_item.return_value = {"Responses": {"carts": [{"session_id": "s1", "snapshot": binary}]}}
+
+        save_carts(store, {f"s{index}": cart for index in range(30)})
+        carts = load_carts(store, [f"s{index}" for index in range(150)], catalog)
+
+        self.assertEqual(store._resource.batch_write_item.call_count, 2)
+        self.assertEqual(store._resource.batch_get_item.call_count, 2)
+        self.assertEqual(list(carts), ["s1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
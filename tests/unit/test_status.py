@@ -0,0 +1,69 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from app.eshop import Shipment
+from services import ShippingService
+from services.status import StatusWatcher
+
+
+class TestStatusWatcher(unittest.TestCase):
+    def test_waiters_share_batched_polls(self):
+        def fetch(shipping_ids):
+            # Statuses only settle once both waiters are served by one poll.
+            if sorted(shipping_ids) == ["s1", "s2"]:
+                return {"s1": "completed", "s2": "failed"}
+            return {shipping_id: "in progress" for shipping_id in shipping_ids}
+
+        watcher = StatusWatcher(fetch, min_interval=0.01, max_interval=0.05)
+        result = {}
+        waiter = threading.Thread(target=lambda: result.update(watcher.wait(["s1"], "completed", 5)))
+        waiter.start()
+        self.assertEqual(watcher.wait(["s2"], {"completed", "failed"}, 5), {"s2": "failed"})
+        waiter.join()
+        self.assertEqual(result, {"s1": "completed"})
+
+    def test_times_out_with_last_seen_status(self):
+        watcher = StatusWatcher(lambda shipping_ids: {}, min_interval=0.01, max_interval=0.02)
+        self.assertEqual(watcher.wait(["missing"], "completed", 0.05), {"missing": None})
+
+    def test_backs_off_while_nothing_changes(self):
+        polled = threading.Event()
+        watcher = StatusWatcher(lambda shipping_ids: polled.set() or {}, min_interval=0.01, max_interval=0.08)
+        watcher.wait(["s1"], "completed", 0.2)
+        self.assertTrue(polled.is_set())
+        self.assertEqual(watcher.interval, 0.08)
+
+    def test_notify_wakes_waiter_without_poll(self):
+        watcher = StatusWatcher(lambda shipping_ids: {}, min_interval=1, max_interval=1)
+        timer = threading.Timer(0.05, watcher.notify, ("s1", "completed"))
+        timer.start()
+        self.assertEqual(watcher.wait(["s1"], "completed", 5), {"s1": "completed"})
+        timer.join()
+
+
+class TestShipmentStatuses(unittest.TestCase):
+    def setUp(self):
+        self.repository = MagicMock()
+        self.repository.get_shippings.return_value = {
+            "s1": {"shipping_id": "s1", "shipping_status": "completed"},
+        }
+        self.repository.update_shipping_status.return_value = {"ResponseMetadata": {}}
+        self.service = ShippingService(self.repository, MagicMock())
+
+    def test_check_many_uses_one_batched_read(self):
+        self.assertEqual(Shipment.check_many(["s1", "s2"], self.service), {"s1": "completed"})
+        self.repository.get_shippings.assert_called_once_with(["s1", "s2"])
+        self.repository.get_shipping.assert_not_called()
+
+    def test_status_updates_are_pushed_to_waiters(self):
+        self.repository.get_shippings.return_value = {}
+        self.service.watcher.min_interval = self.service.watcher.max_interval = 1
+        timer = threading.Timer(0.05, self.service.complete_shipping, ("s2",))
+        timer.start()
+        self.assertEqual(Shipment.wait_for_status(["s2"], "completed", self.service, timeout=5), {"s2": "completed"})
+        timer.join()
+
+
+if __name__ == "__main__":
+    unittest.main()